@@ -44,7 +44,7 @@ def main():
     problem = FleetProblem()
     with io.StringIO(P) as fh:
         problem.load(fh)
-    cost = problem.cost(sol = list(eval(S)))
+    cost = problem.cost(sol = str_to_list_of_tuples(S))
     # print(f"Computed cost = {cost} ({'OK' if cost==C else 'NOK'})")
     print(f"Computed cost = {cost}")
 
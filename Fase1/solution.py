@@ -1,9 +1,28 @@
 import search
+import numpy
+import re
+
+# One action of a plan: ('Pickup'/'Dropoff', v_i, r_i, t)
+ACTION = re.compile(r"\(\s*'(Pickup|Dropoff)'\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*([-+0-9.eEinfa]+)\s*\)")
+
+''' Format a string to a list of tuples. The string is parsed as a list of
+    actions only (never evaluated). '''
+def str_to_list_of_tuples(str):
+    if str == '' or str == 'None':
+        return []
+
+    state = [(pic_drop, int(v_i), int(r_i), int(t) if t.isdigit() else float(t))
+             for pic_drop, v_i, r_i, t in (m.groups() for m in ACTION.finditer(str))]
+    
+    # Every tuple in the string must be a well-formed action
+    if len(state) != str.count('('):
+        raise ValueError("Invalid list of actions")
+    return state
 
 class FleetProblem(search.Problem):    
     def __init__(self):
         self.req = [] # Store the requests
-        self.t_opt = {} # Store the optimal transportation times
+        self.t_opt = numpy.zeros((0, 0)) # Store the optimal transportation times (NP x NP matrix)
         self.vehicles = [] # Store the vehicles
         self.NP = 0 # Number of all pickup/drop-off points
         self.NR = 0 # Number of requests
@@ -28,6 +47,8 @@ class FleetProblem(search.Problem):
             if v != [] and v[0] != "#":
                 if v[0] == 'P': # Detect information about number of points 
                     self.NP = int(v[1])
+                    # Symmetric matrix with zero diagonal: T(p, p) = 0
+                    self.t_opt = numpy.zeros((self.NP, self.NP))
                     mode = 1
                     counter = 0
                 
@@ -51,7 +72,8 @@ class FleetProblem(search.Problem):
                         if Tod <= 0:
                             raise Exception("Invalid transportation time")
                 
-                        self.t_opt[(counter, count_aux)] = Tod # (origin, dropoff) = (counter, count_aux)
+                        self.t_opt[counter, count_aux] = Tod # (origin, dropoff) = (counter, count_aux)
+                        self.t_opt[count_aux, counter] = Tod # T(q, p) = T(p, q)
                         count_aux += 1
                     counter += 1
                     
@@ -69,10 +91,6 @@ class FleetProblem(search.Problem):
                     self.vehicles.append(int(v[0])) # capacity
                     counter += 1 
         
-        # Transportation time is 0 if origin == dropoff: T(p, p) = 0  (como está no enunciado)
-        for p in range(self.NP):
-            self.t_opt[(p, p)] = 0
-
                         
     def cost(self, sol):
         ''' Compute cost of solution sol. '''
@@ -90,9 +108,7 @@ class FleetProblem(search.Problem):
                 t_req, origin, drop_off, _  = self.req[r_i]
                 
                 # Get Tod of the request
-                if origin > drop_off:
-                    origin, drop_off = drop_off, origin
-                Tod = self.t_opt[(origin, drop_off)]
+                Tod = self.t_opt[origin, drop_off]
                 
                 # Delay (dr) = 
                 # = Dropoff time of an action (td) -
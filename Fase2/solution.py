@@ -1,12 +1,23 @@
 import search
+import numpy
+import re
 
-''' Format a string to a list of tuples '''
+# One action of a state: ('Pickup'/'Dropoff', v_i, r_i, t)
+ACTION = re.compile(r"\(\s*'(Pickup|Dropoff)'\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*([-+0-9.eEinfa]+)\s*\)")
+
+''' Format a string to a list of tuples. The string is parsed as a list of
+    actions only (never evaluated). '''
 def str_to_list_of_tuples(str):
     if str == '' or str == 'None':
-        str = []
-    else:
-        str = list(eval(str))
-    return str
+        return []
+
+    state = [(pic_drop, int(v_i), int(r_i), int(t) if t.isdigit() else float(t))
+             for pic_drop, v_i, r_i, t in (m.groups() for m in ACTION.finditer(str))]
+    
+    # Every tuple in the string must be a well-formed action
+    if len(state) != str.count('('):
+        raise ValueError("Invalid list of actions")
+    return state
 
 ''' Format a list of tuples [(a, b, c, d), ...] to string '''
 def list_of_tuples_to_str(state):
@@ -19,12 +30,12 @@ def list_of_tuples_to_str(state):
 class FleetProblem(search.Problem):    
     def __init__(self):
         self.req = [] # Store the requests
-        self.t_opt = {} # Store the optimal transportation times
+        self.t_opt = numpy.zeros((0, 0)) # Store the optimal transportation times (NP x NP matrix)
         self.vehicles = [] # Store the vehicles
         self.NP = 0 # Number of all pickup/drop-off points
         self.NR = 0 # Number of requests
         self.NV = 0 # Number of vehicles
-        self.initial = ''  # Initial state is an empty string (empty list of tuples when we convert it)
+        self.initial = ()  # Initial state is an empty tuple of actions (see result)
     
     ''' Loads a problem from the opened file object fh. '''  
     def load(self, fh):  
@@ -45,6 +56,8 @@ class FleetProblem(search.Problem):
             if v != [] and v[0] != "#":
                 if v[0] == 'P': # Detect information about number of points 
                     self.NP = int(v[1])
+                    # Symmetric matrix with zero diagonal: T(p, p) = 0
+                    self.t_opt = numpy.zeros((self.NP, self.NP))
                     mode = 1
                     counter = 0
                 
@@ -68,7 +81,8 @@ class FleetProblem(search.Problem):
                         if Tod <= 0:
                             raise Exception("Invalid transportation time")
                 
-                        self.t_opt[(counter, count_aux)] = Tod # (origin, dropoff) = (counter, count_aux)
+                        self.t_opt[counter, count_aux] = Tod # (origin, dropoff) = (counter, count_aux)
+                        self.t_opt[count_aux, counter] = Tod # T(q, p) = T(p, q)
                         count_aux += 1
                     counter += 1
                     
@@ -86,9 +100,6 @@ class FleetProblem(search.Problem):
                     self.vehicles.append(int(v[0])) # capacity
                     counter += 1 
         
-        # Transportation time is 0 if origin == dropoff: T(p, p) = 0  (as is in the project handout)
-        for p in range(self.NP):
-            self.t_opt[(p, p)] = 0
             
     ''' Compute cost of solution sol. '''       
     def cost(self, sol):
@@ -106,9 +117,7 @@ class FleetProblem(search.Problem):
                 t_req, origin, drop_off, _  = self.req[r_i]
                 
                 # Get Tod of the request
-                if origin > drop_off:
-                    origin, drop_off = drop_off, origin
-                Tod = self.t_opt[(origin, drop_off)]
+                Tod = self.t_opt[origin, drop_off]
                 
                 # Delay (dr) = 
                 # = Dropoff time of an action (td) -
@@ -148,9 +157,7 @@ class FleetProblem(search.Problem):
                 t_req, origin, drop_off, _  = self.req[r_i]
                 
                 # Get Tod of the request
-                if origin > drop_off:
-                    origin, drop_off = drop_off, origin
-                Tod = self.t_opt[(origin, drop_off)]
+                Tod = self.t_opt[origin, drop_off]
                 
                 # Request Cost = Delay = 
                 # = Dropoff time of an action (td) -
@@ -184,22 +191,13 @@ class FleetProblem(search.Problem):
                     
                     if a_j == 'Pickup':
                         # td_i_estimated = tp_j + Tod(origin_j, destiny_i)
-                        if origin_j < drop_off: # t_opt[(i, j)] must have i <= j
-                            td_i_estimated = tp_j + self.t_opt[(origin_j, drop_off)]
-                        else:
-                            td_i_estimated = tp_j + self.t_opt[(drop_off, origin_j)]
+                        td_i_estimated = tp_j + self.t_opt[origin_j, drop_off]
                     else:
                         # td_i_estimated = tp_j + Tod(origin_j, destiny_i)
-                        if drop_off_j < drop_off:
-                            td_i_estimated = tp_j + self.t_opt[(drop_off_j, drop_off)]
-                        else:
-                            td_i_estimated = tp_j + self.t_opt[(drop_off, drop_off_j)]
+                        td_i_estimated = tp_j + self.t_opt[drop_off_j, drop_off]
                             
                     # td_iopt = tpi + Tod(origin_i, destiny_i)
-                    if origin < drop_off:
-                        td_iopt = tp + self.t_opt[(origin, drop_off)]
-                    else:
-                        td_iopt = tp + self.t_opt[(drop_off, origin)]
+                    td_iopt = tp + self.t_opt[origin, drop_off]
 
                     dr2 = td_i_estimated - td_iopt             
                 else:
@@ -213,14 +211,12 @@ class FleetProblem(search.Problem):
     ''' Return the state that results from executing
         the given action in the given state '''
     def result(self, state, action):
-        # We use as state a string in order to use explored.add(node.state)
-        # However state can only be manipulated in list of tuples format
-        state = str_to_list_of_tuples(state)
-        state.append(action)
+        # We use as state a tuple of actions, hashable (explored.add(node.state))
+        # and orderable (ties in the priority queue), used as it is by every method
+        state = state + (action,)
     
         # Sort state in order to ensure the correct working of the priority queue (without duplicates)
-        state = sorted(state, key=lambda x: (x[3], x[0][0], x[1], x[2]))
-        return list_of_tuples_to_str(state)
+        return tuple(sorted(state, key=lambda x: (x[3], x[0][0], x[1], x[2])))
         
     ''' Return the actions that can be executed in the given state. '''
     def actions(self, state):
@@ -230,8 +226,6 @@ class FleetProblem(search.Problem):
         # (0): status of requirements 0 (start), 1 (picked up), 2 (finished)
         # (1): index of the vehicle in charge of the request
         
-        state = str_to_list_of_tuples(state)
-        
         # Get the number of currently available seats in each vehicle, the 
         # status of each request and the index of the vehicle associated with each request
         for s in state:
@@ -268,7 +262,7 @@ class FleetProblem(search.Problem):
                     # Check if vehicle has ever been used
                     if action_j == []:
                         new_action_point = self.req[request[1]][1] # get origin from request, because always 'Pickup'
-                        t = max(self.t_opt[(0, new_action_point)], self.req[request[1]][0]) 
+                        t = max(self.t_opt[0, new_action_point], self.req[request[1]][0]) 
                         # t = max(time from point 0 to new action's point, t_req)
                     else: 
                         if action_j[0][0] == 'Pickup':
@@ -281,12 +275,12 @@ class FleetProblem(search.Problem):
                         else:
                             new_action_point = self.req[request[1]][2] # get destiny from request
                             
-                        if action_j_point > new_action_point :
-                            action_j_point,new_action_point = new_action_point, action_j_point
-                            
                         # t = max(t_drop/pick_j + time from point j to new action's point , t_req)
-                        t = max(action_j[0][3] + self.t_opt[(action_j_point, new_action_point)], self.req[request[1]][0])
+                        t = max(action_j[0][3] + self.t_opt[action_j_point, new_action_point], self.req[request[1]][0])
                             
+                    # Plain Python times: numpy scalars would end up in the states and the plan
+                    if isinstance(t, numpy.generic):
+                        t = t.item()
                     actions.append((request[0], indexV, request[1], t))
                     # action = (pickup/dropoff, vehicle index, request index, time)
 
@@ -294,14 +288,13 @@ class FleetProblem(search.Problem):
     
     ''' Return True if the state is a goal. ''' 
     def goal_test(self, state):
-        state = str_to_list_of_tuples(state)
         # Solution is complete if it has number of elements = 2 * number of requests,
         # i.e, a pickup and a dropoff per request
         return len(state) == len(self.req) * 2
     
     ''' Return the cost of a solution path that arrives at state2. '''
     def path_cost(self, c, state1, action, state2):
-        return self.cost2(list(eval(state2))) 
+        return self.cost2(state2) 
     
     ''' Calls the uninformed search algorithm
         chosen. Returns a solution using the specified format. '''
@@ -314,4 +307,4 @@ class FleetProblem(search.Problem):
         # less than of optimal solution.
 
         solution = search.uniform_cost_search(self,display=True)
-        return str_to_list_of_tuples(solution.state)
+        return list(solution.state)
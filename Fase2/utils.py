@@ -724,10 +724,12 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
+    Also supports dict-like lookup. Membership is a dict lookup (on the hash
+    of the items), so it does not scan the heap."""
 
     def __init__(self, order='min', f=lambda x: x):
         self.heap = []
+        self.counts = {}  # item -> number of times it is in the heap
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
@@ -738,17 +740,27 @@ class PriorityQueue:
     def append(self, item):
         """Insert item at its correct position."""
         heapq.heappush(self.heap, (self.f(item), item))
+        self.counts[item] = self.counts.get(item, 0) + 1
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
         for item in items:
             self.append(item)
 
+    def _discount(self, item):
+        """Take one occurrence of item out of counts."""
+        if self.counts[item] == 1:
+            del self.counts[item]
+        else:
+            self.counts[item] -= 1
+
     def pop(self):
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
         if self.heap:
-            return heapq.heappop(self.heap)[1]
+            item = heapq.heappop(self.heap)[1]
+            self._discount(item)
+            return item
         else:
             raise Exception('Trying to pop from empty PriorityQueue.')
 
@@ -758,7 +770,7 @@ class PriorityQueue:
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return key in self.counts
 
     def __getitem__(self, key):
         """Returns the first value associated with key in PriorityQueue.
@@ -771,9 +783,11 @@ class PriorityQueue:
     def __delitem__(self, key):
         """Delete the first occurrence of key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
+            i = [item == key for _, item in self.heap].index(True)
         except ValueError:
             raise KeyError(str(key) + " is not in the priority queue")
+        self._discount(self.heap[i][1])
+        del self.heap[i]
         heapq.heapify(self.heap)
 
 
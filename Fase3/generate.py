@@ -0,0 +1,110 @@
+import sys
+import argparse
+import numpy
+
+''' Random positions of NP points in a size x size square.
+    geometry = 'euclidean': points spread uniformly over the square;
+    geometry = 'clustered': points grouped around n_clusters random centres. '''
+def random_points(rng, NP, geometry='euclidean', size=1.0, n_clusters=4, spread=0.05):
+    if geometry == 'euclidean':
+        return rng.uniform(0, size, (NP, 2))
+    elif geometry == 'clustered':
+        centres = rng.uniform(0, size, (n_clusters, 2))
+        cluster = rng.integers(0, n_clusters, NP)
+        return numpy.clip(centres[cluster] + rng.normal(0, spread * size, (NP, 2)), 0, size)
+    else:
+        raise ValueError("Geometry must be either 'euclidean' or 'clustered'.")
+
+''' Request times of NR requests.
+    arrival = 'poisson': exponential inter-arrival times with the given rate
+    (requests per time unit), i.e. the times come out in increasing order;
+    arrival = 'uniform': times drawn uniformly over [0, horizon]. '''
+def random_request_times(rng, NR, arrival='poisson', rate=1.0, horizon=10.0):
+    if arrival == 'poisson':
+        return numpy.cumsum(rng.exponential(1 / rate, NR))
+    elif arrival == 'uniform':
+        return rng.uniform(0, horizon, NR)
+    else:
+        raise ValueError("Arrival must be either 'poisson' or 'uniform'.")
+
+''' Writes to the opened file object fh a random problem in the .dat format
+    (P, R and V sections), reproducible from seed.
+    Transportation times are the euclidean distances between random points
+    (see random_points) divided by speed. Capacities are drawn from the list
+    capacities with probabilities weights (uniform if None), and each request
+    has between 1 and the largest capacity passengers (at most max_pass). '''
+def generate(fh, NP, NR, NV, seed=None, geometry='euclidean', arrival='poisson',
+             rate=1.0, horizon=10.0, capacities=(2, 3, 4, 5, 6, 7, 8, 9), weights=None,
+             max_pass=None, speed=1.0, n_clusters=4):
+    rng = numpy.random.default_rng(seed)
+
+    points = random_points(rng, NP, geometry, n_clusters=n_clusters)
+    i, j = numpy.triu_indices(NP, 1)
+    t_upper = numpy.hypot(*(points[i] - points[j]).T) / speed
+    # T(p, q) > 0 if p != q, even for points drawn at the same position
+    t_upper = numpy.maximum(t_upper, numpy.finfo(float).eps)
+
+    if weights is not None:
+        weights = numpy.asarray(weights, dtype=float) / numpy.sum(weights)
+    vehicles = rng.choice(capacities, NV, p=weights)
+
+    # Largest group that some vehicle can carry
+    n_max = int(vehicles.max()) if NV > 0 else 1
+    if max_pass is not None:
+        n_max = min(n_max, max_pass)
+
+    t_req = random_request_times(rng, NR, arrival, rate, horizon)
+    origin = rng.integers(0, NP, NR)
+    # Drop-off point different from the origin
+    drop_off = (origin + rng.integers(1, max(NP, 2), NR)) % NP
+    n_pass = rng.integers(1, n_max + 1, NR)
+
+    fh.write(f"# {geometry} points, {arrival} arrivals, seed {seed}\n")
+    fh.write(f"P {NP}\n")
+    start = 0
+    for p in range(NP - 1):
+        row = t_upper[start : start + NP - 1 - p]
+        fh.write(' '.join(repr(float(t)) for t in row) + '\n')
+        start += row.size
+
+    fh.write(f"R {NR}\n")
+    for r in range(NR):
+        fh.write(f"{float(t_req[r])!r} {origin[r]} {drop_off[r]} {n_pass[r]}\n")
+
+    fh.write(f"V {NV}\n")
+    for capacity in vehicles:
+        fh.write(f"{capacity}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a random problem in the .dat format.")
+    parser.add_argument('output', nargs='?', help=".dat file to write (standard output if omitted)")
+    parser.add_argument('-P', '--points', type=int, default=20)
+    parser.add_argument('-R', '--requests', type=int, default=5)
+    parser.add_argument('-V', '--vehicles', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--geometry', choices=['euclidean', 'clustered'], default='euclidean')
+    parser.add_argument('--clusters', type=int, default=4)
+    parser.add_argument('--arrival', choices=['poisson', 'uniform'], default='poisson')
+    parser.add_argument('--rate', type=float, default=1.0, help="requests per time unit (poisson)")
+    parser.add_argument('--horizon', type=float, default=10.0, help="last request time (uniform)")
+    parser.add_argument('--capacities', type=int, nargs='+', default=[2, 3, 4, 5, 6, 7, 8, 9])
+    parser.add_argument('--weights', type=float, nargs='+', default=None)
+    parser.add_argument('--max-pass', type=int, default=None)
+    parser.add_argument('--speed', type=float, default=1.0)
+    args = parser.parse_args()
+
+    options = dict(seed=args.seed, geometry=args.geometry, arrival=args.arrival,
+                   rate=args.rate, horizon=args.horizon, capacities=args.capacities,
+                   weights=args.weights, max_pass=args.max_pass, speed=args.speed,
+                   n_clusters=args.clusters)
+    if args.output is None:
+        generate(sys.stdout, args.points, args.requests, args.vehicles, **options)
+    else:
+        with open(args.output, 'w') as fh:
+            generate(fh, args.points, args.requests, args.vehicles, **options)
+
+
+if __name__=='__main__':
+    main()
+
+# EOF
@@ -0,0 +1,363 @@
+import heapq
+import numpy
+from collections import OrderedDict
+
+import search
+
+INFINITY = numpy.inf
+
+''' Builds the road graph (a search.UndirectedGraph whose nodes are the points
+    0..n-1) from the edge list p[i] -- q[i] with travel time t[i]. Of parallel
+    edges, only the fastest one is kept; edges with a point out of range or
+    without a positive time are left out (see FleetProblem.validate). '''
+def road_graph(n, p, q, t):
+    graph = search.UndirectedGraph()
+    for a, b, w in zip(numpy.asarray(p).tolist(), numpy.asarray(q).tolist(), numpy.asarray(t).tolist()):
+        if a != b and 0 <= a < n and 0 <= b < n and w > 0 and (graph.get(a, b) is None or w < graph.get(a, b)):
+            graph.connect(a, b, w)
+    return graph
+
+''' Shortest travel times from point source to every point 0..n-1 of graph,
+    with Dijkstra's algorithm. Unreachable points get infinity. '''
+def dijkstra(graph, source, n):
+    links = graph.graph_dict
+    dist = [INFINITY] * n
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue # Already reached through a shorter path
+        for v, w in links.get(u, {}).items():
+            if d + w < dist[v]:
+                dist[v] = d + w
+                heapq.heappush(heap, (d + w, v))
+
+    return numpy.array(dist)
+
+''' Travel times between the n points of a road graph, indexed like the dense
+    matrix: m[o, d], with o and d integers or arrays. A row (all times from one
+    point) is computed with dijkstra the first time it is needed, and only the
+    cache_size most recently used rows are kept. As the graph is undirected,
+    m[o, d] is answered from the row of o or from the row of d. '''
+class RoadMatrix:
+    def __init__(self, graph, n, cache_size=128):
+        self.graph = graph
+        self.n = n
+        self.shape = (n, n)
+        self.cache_size = cache_size
+        self.rows = OrderedDict() # point -> row, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    ''' Travel times from point p to every point '''
+    def row(self, p):
+        row = self.rows.get(p)
+        if row is not None:
+            self.hits += 1
+            self.rows.move_to_end(p)
+            return row
+
+        self.misses += 1
+        row = dijkstra(self.graph, p, self.n)
+        self.rows[p] = row
+        if len(self.rows) > self.cache_size:
+            self.rows.popitem(last=False)
+        return row
+
+    def __getitem__(self, key):
+        o, d = key
+        if numpy.isscalar(o) and numpy.isscalar(d):
+            if o == d:
+                return 0.0
+            # Prefer a row that is already computed
+            if o not in self.rows and d in self.rows:
+                o, d = d, o
+            return self.row(o)[d]
+
+        # Vectorized batch query: one row per distinct origin
+        o, d = numpy.broadcast_arrays(numpy.asarray(o), numpy.asarray(d))
+        t = numpy.zeros(o.shape)
+        for p in numpy.unique(o).tolist():
+            mask = o == p
+            t[mask] = self.row(p)[d[mask]]
+        return t
+
+''' ALT (A*, landmarks and triangle inequality) lower bounds on the shortest
+    travel times of graph, a search.Graph (directed or not) with any hashable
+    nodes. k landmarks are chosen, each as far as possible from the previous
+    ones, and the shortest times from and to each of them are stored. Then, for
+    every landmark l, by the triangle inequality:
+        d(u, v) >= d(l, v) - d(l, u)   and   d(u, v) >= d(u, l) - d(v, l).
+    lower_bound(u, v) takes nodes; m[i, j] takes positions in nodes (integers
+    or arrays), so with nodes = range(n) it is indexed like the dense matrix. '''
+class Landmarks:
+    def __init__(self, graph, k=8, nodes=None):
+        self.nodes = list(graph.nodes()) if nodes is None else list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        n = len(self.nodes)
+        self.shape = (n, n)
+
+        # Same graph, with nodes replaced by their positions (and reversed, if directed)
+        forward = search.Graph({}, directed=True)
+        backward = search.Graph({}, directed=True)
+        for a, links in graph.graph_dict.items():
+            for b, w in links.items():
+                forward.connect1(self.index[a], self.index[b], w)
+                backward.connect1(self.index[b], self.index[a], w)
+
+        self.landmarks = []
+        dist_from, dist_to = [], []
+        closest = numpy.full(n, INFINITY) # Time from each node to its closest landmark
+        start = 0
+        for _ in range(min(k, n)):
+            if self.landmarks:
+                # Farthest node from the landmarks chosen so far (another component, if any)
+                start = int(numpy.argmax(numpy.where(numpy.isinf(closest), numpy.finfo(float).max, closest)))
+                if closest[start] == 0:
+                    break
+            else:
+                # First landmark: farthest node from an arbitrary one
+                row = dijkstra(forward, start, n)
+                start = int(numpy.argmax(numpy.where(numpy.isinf(row), -1, row)))
+            self.landmarks.append(start)
+            dist_from.append(dijkstra(forward, start, n))
+            dist_to.append(dist_from[-1] if not graph.directed else dijkstra(backward, start, n))
+            closest = numpy.minimum(closest, numpy.minimum(dist_from[-1], dist_to[-1]))
+
+        self.dist_from = numpy.array(dist_from).reshape(-1, n) # d(l, u)
+        self.dist_to = numpy.array(dist_to).reshape(-1, n) # d(u, l)
+
+    ''' Lower bound on the shortest travel time from node u to node v '''
+    def lower_bound(self, u, v):
+        return self[self.index[u], self.index[v]]
+
+    def __getitem__(self, key):
+        i, j = key
+        # inf - inf (neither node reaches the landmark) says nothing: bound 0
+        with numpy.errstate(invalid='ignore'):
+            bounds = numpy.maximum(self.dist_from[:, j] - self.dist_from[:, i],
+                                   self.dist_to[:, i] - self.dist_to[:, j])
+        bounds = numpy.where(numpy.isnan(bounds), 0.0, bounds)
+        bound = numpy.max(bounds, axis=0, initial=0.0)
+        return float(bound) if numpy.ndim(bound) == 0 else bound
+
+''' Contraction hierarchy of graph, a search.Graph (directed or not) with any
+    hashable nodes, for exact shortest travel times in a few small searches.
+    Nodes are contracted one at a time, least important first (fewest
+    shortcuts added, see _priority): the paths through a contracted node are
+    kept as shortcuts between its neighbours, unless a witness search finds
+    a path that is no longer. Then every shortest path goes up the ranks and
+    back down, so a query only searches the edges towards higher ranks: up
+    (u -> w) from the source and down (w -> u, reversed) from the target.
+    Like Landmarks, distance(u, v) takes nodes and m[i, j] positions in
+    nodes; row(i) gives all times from a position, as RoadMatrix does.
+    The preprocessed hierarchy can be saved (see save and load_hierarchy). '''
+class ContractionHierarchy:
+    def __init__(self, graph=None, nodes=None, witness_limit=50):
+        self.graph = graph
+        self.nodes = []
+        self.index = {}
+        self.n = 0
+        self.shape = (0, 0)
+        self.rank = numpy.zeros(0, dtype=int)
+        self.up = []   # Per position, (w, t) with rank[w] > rank: edge -> w
+        self.down = [] # Per position, (w, t) with rank[w] > rank: edge w ->
+        self.witness_limit = witness_limit # Nodes settled by a witness search
+        if graph is not None:
+            self.contract(graph, nodes)
+
+    def set_nodes(self, nodes):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.n = len(self.nodes)
+        self.shape = (self.n, self.n)
+
+    ''' Shortest paths u -> x (avoiding v) up to limit, with Dijkstra's
+        algorithm on the remaining graph out, settling at most witness_limit nodes '''
+    def _witness(self, out, u, v, limit):
+        dist = {u: 0.0}
+        heap = [(0.0, u)]
+        settled = 0
+        while heap and settled < self.witness_limit:
+            d, x = heapq.heappop(heap)
+            if d > dist[x]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for y, w in out[x].items():
+                if y != v and d + w < dist.get(y, INFINITY):
+                    dist[y] = d + w
+                    heapq.heappush(heap, (d + w, y))
+        return dist
+
+    ''' Shortcuts (u, w, t) needed to contract v from the remaining graph '''
+    def _shortcuts(self, out, inn, v):
+        shortcuts = []
+        if not out[v]:
+            return shortcuts
+        longest = max(out[v].values())
+        for u, t_in in inn[v].items():
+            dist = self._witness(out, u, v, t_in + longest)
+            for w, t_out in out[v].items():
+                if w != u and dist.get(w, INFINITY) > t_in + t_out:
+                    shortcuts.append((u, w, t_in + t_out))
+        return shortcuts
+
+    ''' Importance of contracting v now: edge difference, plus the neighbours
+        already contracted (to spread the contractions over the graph) '''
+    def _priority(self, out, inn, v, contracted):
+        return len(self._shortcuts(out, inn, v)) - len(out[v]) - len(inn[v]) + contracted[v]
+
+    ''' Contracts graph, with nodes (all nodes of graph if None) at the positions '''
+    def contract(self, graph, nodes=None):
+        self.set_nodes(graph.nodes() if nodes is None else nodes)
+        n = self.n
+
+        # Remaining graph, by positions: out[u][w] = in[w][u] = time of u -> w
+        out = [{} for _ in range(n)]
+        inn = [{} for _ in range(n)]
+        for a, links in graph.graph_dict.items():
+            for b, w in links.items():
+                u, x = self.index[a], self.index[b]
+                if u != x and w < out[u].get(x, INFINITY):
+                    out[u][x] = inn[x][u] = w
+
+        contracted = [0] * n
+        heap = [(self._priority(out, inn, v, contracted), v) for v in range(n)]
+        heapq.heapify(heap)
+        self.rank = numpy.zeros(n, dtype=int)
+        self.up = [None] * n
+        self.down = [None] * n
+        rank = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            # Lazy update: contract v only if it is still the least important
+            priority = self._priority(out, inn, v, contracted)
+            if heap and priority > heap[0][0]:
+                heapq.heappush(heap, (priority, v))
+                continue
+
+            for u, w, t in self._shortcuts(out, inn, v):
+                if t < out[u].get(w, INFINITY):
+                    out[u][w] = inn[w][u] = t
+            # The remaining neighbours of v are all contracted later: higher ranks
+            self.up[v] = list(out[v].items())
+            self.down[v] = list(inn[v].items())
+            for w in out[v]:
+                del inn[w][v]
+                contracted[w] += 1
+            for u in inn[v]:
+                del out[u][v]
+                contracted[u] += 1
+            out[v], inn[v] = {}, {}
+            self.rank[v] = rank
+            rank += 1
+
+        # Nodes from the highest rank down, for row
+        self.order = numpy.argsort(-self.rank).tolist()
+
+    ''' Times of the upward search from position i over links (up or down) '''
+    def _upward(self, links, i):
+        dist = {i: 0.0}
+        heap = [(0.0, i)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for w, t in links[u]:
+                if d + t < dist.get(w, INFINITY):
+                    dist[w] = d + t
+                    heapq.heappush(heap, (d + t, w))
+        return dist
+
+    ''' Shortest travel time between positions i and j: bidirectional
+        upward search, each side stopped once it cannot improve the best
+        meeting node found so far '''
+    def query(self, i, j):
+        if i == j:
+            return 0.0
+        dist = ({i: 0.0}, {j: 0.0})
+        heaps = ([(0.0, i)], [(0.0, j)])
+        links = (self.up, self.down)
+        best = INFINITY
+        while heaps[0] or heaps[1]:
+            for side in (0, 1):
+                heap, d_side, d_other = heaps[side], dist[side], dist[1 - side]
+                if not heap:
+                    continue
+                d, u = heapq.heappop(heap)
+                if d > d_side[u]:
+                    continue
+                if d >= best:
+                    heap.clear()
+                    continue
+                if u in d_other:
+                    best = min(best, d + d_other[u])
+                for w, t in links[side][u]:
+                    if d + t < d_side.get(w, INFINITY):
+                        d_side[w] = d + t
+                        heapq.heappush(heap, (d + t, w))
+        return best
+
+    ''' Shortest travel time from node u to node v '''
+    def distance(self, u, v):
+        return self.query(self.index[u], self.index[v])
+
+    ''' Travel times from position i to every position (one upward search,
+        then a sweep down the ranks over the down edges) '''
+    def row(self, i):
+        dist = numpy.full(self.n, INFINITY)
+        for u, d in self._upward(self.up, i).items():
+            dist[u] = d
+        for v in self.order:
+            for u, t in self.down[v]:
+                if dist[u] + t < dist[v]:
+                    dist[v] = dist[u] + t
+        return dist
+
+    def __getitem__(self, key):
+        i, j = key
+        if numpy.isscalar(i) and numpy.isscalar(j):
+            return self.query(i, j)
+        i, j = numpy.broadcast_arrays(numpy.asarray(i), numpy.asarray(j))
+        t = [self.query(a, b) for a, b in zip(i.ravel().tolist(), j.ravel().tolist())]
+        return numpy.array(t, dtype=float).reshape(i.shape)
+
+    ''' The preprocessed hierarchy as arrays, by name (prefix + name): the up
+        and down edges as flat arrays with the start of each node's edges '''
+    def arrays(self, prefix=''):
+        arrays = {'nodes': numpy.array(self.nodes), 'rank': self.rank}
+        for name, links in (('up', self.up), ('down', self.down)):
+            arrays[name + '_start'] = numpy.cumsum([0] + [len(l) for l in links])
+            arrays[name + '_to'] = numpy.array([w for l in links for w, _ in l], dtype=int)
+            arrays[name + '_t'] = numpy.array([t for l in links for _, t in l], dtype=float)
+        return {prefix + name: a for name, a in arrays.items()}
+
+    ''' Saves the preprocessed hierarchy (see arrays) to the binary (.npz) file path '''
+    def save(self, path):
+        with open(path, 'wb') as fh:
+            numpy.savez(fh, **self.arrays())
+
+''' Contraction hierarchy from the arrays data (a dict or an opened .npz file)
+    written by ContractionHierarchy.arrays with the same prefix. It has no
+    graph unless given one: without it, only queries can be made. '''
+def hierarchy_from_arrays(data, prefix='', graph=None):
+    ch = ContractionHierarchy()
+    ch.graph = graph
+    ch.set_nodes(data[prefix + 'nodes'].tolist())
+    ch.rank = data[prefix + 'rank']
+    for name in ('up', 'down'):
+        start = data[prefix + name + '_start'].tolist()
+        to, t = data[prefix + name + '_to'].tolist(), data[prefix + name + '_t'].tolist()
+        setattr(ch, name, [list(zip(to[a:b], t[a:b])) for a, b in zip(start[:-1], start[1:])])
+    ch.order = numpy.argsort(-ch.rank).tolist()
+    return ch
+
+''' Loads a contraction hierarchy from the binary (.npz) file path written by
+    ContractionHierarchy.save. It has no graph: only queries can be made. '''
+def load_hierarchy(path):
+    with numpy.load(path, allow_pickle=False) as data:
+        return hierarchy_from_arrays(data)
@@ -8,3 +8,4 @@ python3 simple_test.py ex6
 python3 simple_test.py ex7
 python3 simple_test.py ex8
 python3 simple_test.py ex9
+python3 simple_test.py ex3 10
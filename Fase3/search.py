@@ -257,17 +257,18 @@ def breadth_first_graph_search(problem):
     return None
 
 
-def best_first_graph_search(problem, f, display=False):
+def best_first_graph_search(problem, f, display=False, queue=PriorityQueue):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    The frontier is a queue('min', f): BucketQueue suits integer f values."""
     f = memoize(f, 'f')    
     node = Node(problem.initial)
-    frontier = PriorityQueue('min', f)
+    frontier = queue('min', f)
     frontier.append(node)
     explored = set()
     while frontier:
@@ -412,12 +413,12 @@ greedy_best_first_graph_search = best_first_graph_search
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
 
 
-def astar_search(problem, h=None, display=False):
+def astar_search(problem, h=None, display=False, queue=PriorityQueue):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
     else in your Problem subclass."""
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display)
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display, queue)
 
 
 # ______________________________________________________________________________
@@ -1179,9 +1180,10 @@ australia_map.locations = dict(WA=(120, 24), NT=(135, 20), SA=(135, 30),
 class GraphProblem(Problem):
     """The problem of searching a graph from one node to another."""
 
-    def __init__(self, initial, goal, graph):
+    def __init__(self, initial, goal, graph, landmarks=None):
         super().__init__(initial, goal)
         self.graph = graph
+        self.landmarks = landmarks
 
     def actions(self, A):
         """The actions at a graph node are just its neighbors."""
@@ -1204,7 +1206,12 @@ class GraphProblem(Problem):
         return m
 
     def h(self, node):
-        """h function is straight-line distance from a node's state to goal."""
+        """h function is straight-line distance from a node's state to goal.
+        If landmarks (see roads.Landmarks) were given, it is their ALT lower
+        bound on the shortest path instead, which needs no locations."""
+        if self.landmarks is not None:
+            state = node.state if isinstance(node, Node) else node
+            return self.landmarks.lower_bound(state, self.goal)
         locs = getattr(self.graph, 'locations', None)
         if locs:
             if type(node) is str:
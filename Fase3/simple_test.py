@@ -6,10 +6,9 @@ from solution import *
 
 test = sys.argv
 
-File2  = open("../public3/"+test[1]+".dat", "r")
-
-P = File2.read()
-File2.close()
+path = "../public3/"+test[1]+".dat"
+# Optional integer time mode (see FleetProblem.time_resolution)
+resolution = int(test[2]) if len(test) > 2 else None
 
 # P = """
 # # this is a comment
@@ -39,8 +38,8 @@ import time
 
 def main():
     problem = FleetProblem()
-    with io.StringIO(P) as fh:
-        problem.load(fh)
+    problem.time_resolution = resolution
+    problem.load_file(path)
         
     start_time = time.time()
     solution = problem.solve()
@@ -48,6 +47,17 @@ def main():
     
     # print(solution)
     print(problem.cost(solution))
+    
+    if resolution is not None:
+        # The .dat file (cold load) and its compiled form (warm load) must give
+        # the same cost, and the compiled form must still hold float times
+        costs = []
+        for time_resolution, cache in ((resolution, False), (resolution, True), (None, False), (None, True)):
+            check = FleetProblem()
+            check.time_resolution = time_resolution
+            check.load_file(path, cache=cache)
+            costs.append(check.cost(check.solve()))
+        print(f"Cold/warm load costs = {costs} ({'OK' if costs[0] == costs[1] and costs[2] == costs[3] else 'NOK'})")
 
         
 if __name__=='__main__':
@@ -1,16 +1,53 @@
 import search
 import numpy 
+import roads
+import utils
+import bisect
+from array import array
+import gzip
+import hashlib
+import lzma
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
 from itertools import permutations
 
 INFINITY = numpy.inf
+MASK64 = (1 << 64) - 1
 
-''' Format a string to a list of tuples '''
+# One action of a state or plan: ('Pickup'/'Dropoff', v_i, r_i, t)
+ACTION = re.compile(r"\(\s*'(Pickup|Dropoff)'\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*([-+0-9.eEinfa]+)\s*\)")
+
+''' Format a string to a list of tuples. The string is parsed as a list of
+    actions only (never evaluated), so it also suits large .plan files. '''
 def str_to_list_of_tuples(str):
     if str == '' or str == 'None':
-        str = []
-    else:
-        str = list(eval(str))
-    return str
+        return []
+
+    # Times are kept as integers when written as such (see FleetProblem.time_resolution)
+    state = [(pic_drop, int(v_i), int(r_i), int(t) if t.isdigit() else float(t))
+             for pic_drop, v_i, r_i, t in (m.groups() for m in ACTION.finditer(str))]
+    
+    # Every tuple in the string must be a well-formed action
+    if len(state) != str.count('('):
+        raise ValueError("Invalid list of actions")
+    return state
+
+''' SplitMix64 finalizer of the 64-bit integer x: a bijection, so distinct
+    inputs give distinct outputs, with every output bit depending on every
+    input bit (see FleetProblem.zobrist_key). '''
+def splitmix64(x):
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & MASK64
+    return x ^ (x >> 31)
+
+''' Sort key of the actions of a plan: by time, then dropoffs before pickups,
+    then by vehicle and request (so that equal plans are equal tuples). '''
+def action_order(action):
+    return (action[3], action[0][0], action[1], action[2])
 
 ''' Format a list of tuples [(a, b, c, d), ...] to string '''
 def list_of_tuples_to_str(state):
@@ -19,39 +56,271 @@ def list_of_tuples_to_str(state):
     # Joining the formatted tuples into a single string, separated by commas
     result_string = ', '.join(tuple_strings)
     return '[' + result_string + ']'
+
+''' Shortest-path (metric) closure of the NP x NP transportation times t
+    (dense or PackedMatrix), with a Floyd-Warshall vectorized over each pivot
+    point: T'(p, q) = min over paths from p to q of the sum of their times.
+    T' satisfies the triangle inequality, so it is a lower bound on the time
+    from p to q even when the vehicle visits other points on the way.
+    Returns T' (same storage as t) and the pairs (p, q), p < q, with
+    T'(p, q) < T(p, q). '''
+def metric_closure(t):
+    packed = isinstance(t, PackedMatrix)
+    original = t.dense() if packed else numpy.asarray(t)
+    closed = original.copy()
+    
+    for k in range(closed.shape[0]):
+        numpy.minimum(closed, closed[:, k, None] + closed[None, k, :], out=closed)
+    
+    tightened = numpy.argwhere(numpy.triu(closed < original, 1))
+    
+    if packed:
+        t_lb = PackedMatrix(t.n, t.data.dtype)
+        t_lb.data = closed[numpy.triu_indices(t.n, 1)]
+        return t_lb, tightened
+    return closed, tightened
+
+''' Open the .dat file path for reading as text. gzip and xz compressed
+    files are detected by their magic number and decompressed on the fly. '''
+def open_dat(path):
+    with open(path, 'rb') as fh:
+        magic = fh.read(6)
+    if magic[:2] == b'\x1f\x8b':
+        return gzip.open(path, 'rt')
+    if magic == b'\xfd7zXZ\x00':
+        return lzma.open(path, 'rt')
+    return open(path, 'r')
+
+''' Symmetric NP x NP matrix with zero diagonal that only stores its strict
+    upper triangle, row by row, in a flat buffer of NP*(NP-1)/2 values
+    (the same order in which the .dat file lists the transportation times).
+    Indexed like the dense matrix: m[o, d], with o and d integers or arrays. '''
+class PackedMatrix:
+    def __init__(self, n, dtype=numpy.float64):
+        self.n = n
+        self.shape = (n, n)
+        self.data = numpy.zeros(n * (n - 1) // 2, dtype=dtype)
+
+    ''' Position in the flat buffer of the pair (o, d), o != d '''
+    def index(self, o, d):
+        i = numpy.minimum(o, d)
+        j = numpy.maximum(o, d)
+        # Rows 0..i-1 hold (n-1) + (n-2) + ... + (n-i) values
+        return i * (2 * self.n - i - 1) // 2 + (j - i - 1)
+
+    ''' Pairs (o, d), o < d, at the positions k of the flat buffer (inverse of index) '''
+    def pair(self, k):
+        k = numpy.asarray(k, dtype=numpy.int64)
+        b = 2 * self.n - 1
+        start = lambda i: i * (b - i) // 2
+        # Row i is the largest with start(i) <= k, up to the rounding of the root
+        i = ((b - numpy.sqrt(b * b - 8.0 * k)) // 2).astype(numpy.int64)
+        i = numpy.where(start(i + 1) <= k, i + 1, i)
+        i = numpy.where(start(i) > k, i - 1, i)
+        return i, k - start(i) + i + 1
+
+    def __getitem__(self, key):
+        o, d = key
+        if numpy.isscalar(o) and numpy.isscalar(d):
+            if o == d:
+                return self.data.dtype.type(0) # 0.0, or 0 for integer times
+            return self.data[self.index(o, d)]
+
+        # Vectorized batch query: arrays of origins and destinations
+        o, d = numpy.broadcast_arrays(numpy.asarray(o), numpy.asarray(d))
+        same = o == d
+        k = numpy.where(same, 0, self.index(o, d))
+        return numpy.where(same, self.data.dtype.type(0), self.data[k] if self.data.size else 0)
+
+    def __setitem__(self, key, value):
+        o, d = key
+        if o == d:
+            if value != 0:
+                raise Exception("Invalid transportation time")
+            return
+        self.data[self.index(o, d)] = value
+
+    ''' Expand to the dense NP x NP matrix '''
+    def dense(self):
+        m = numpy.zeros(self.shape, dtype=self.data.dtype)
+        i, j = numpy.triu_indices(self.n, 1)
+        m[i, j] = self.data
+        m[j, i] = self.data
+        return m
+
+''' Times of t (any matrix indexed as t[o, d]) in integer ticks of
+    1/resolution time units, rounded as they are read. It stands for the
+    matrices that are not converted at once in integer time mode (see
+    FleetProblem.ticks): memory-mapped, shared or computed on demand. '''
+class FixedPointTimes:
+    def __init__(self, t, resolution):
+        self.t = t
+        self.resolution = resolution
+        self.shape = t.shape
+
+    def __getitem__(self, key):
+        ticks = numpy.rint(numpy.asarray(self.t[key], dtype=float) * self.resolution).astype(numpy.int64)
+        return int(ticks) if ticks.ndim == 0 else ticks
+
+''' Search state, stored as the action that led to it from its parent
+    state (None for the initial state), so that a state takes the same
+    memory whatever its depth: the action, a reference and two integers.
+    Its plan (actions sorted by time) is only put together when asked for,
+    with plan(), and the summaries actions and h read (see
+    FleetProblem.summary) are computed from it when the state is expanded.
+    States are compared as their plans, and ordered (ties in the priority
+    queue) by depth and time of the last action first. They are hashed (explored.add(node.state))
+    by hash, the Zobrist hash of the plan given by FleetProblem.extend: the
+    XOR of a key per action, so it does not depend on the order of the actions. '''
+class FleetState:
+    __slots__ = ('parent', 'action', 'depth', 'hash')
+
+    def __init__(self, parent, action, hash=0):
+        self.parent = parent
+        self.action = action
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.hash = hash
+
+    ''' The plan: actions from the initial state, sorted as by action_order '''
+    def plan(self):
+        actions = []
+        state = self
+        while state.parent is not None:
+            actions.append(state.action)
+            state = state.parent
+        return tuple(sorted(actions, key=action_order))
+
+    def __len__(self):
+        return self.depth
+
+    def __eq__(self, other):
+        # Plans are only put together if the hashes match
+        return (isinstance(other, FleetState) and self.hash == other.hash
+                and self.depth == other.depth and self.plan() == other.plan())
+
+    def __hash__(self):
+        return self.hash
+
+    def __lt__(self, other):
+        # Ties of f: deeper states first (closer to a goal), then the latest
+        # last action (more of the cost already in g rather than estimated
+        # by h). Plans are only put together if both match
+        if self.depth != other.depth:
+            return self.depth > other.depth
+        if self.depth > 0 and self.action[3] != other.action[3]:
+            return self.action[3] > other.action[3]
+        return self.plan() < other.plan()
+
+    def __repr__(self):
+        return f"FleetState({self.plan()!r})"
     
 class FleetProblem(search.Problem):    
-    def __init__(self):
+    def __init__(self, packed=False, metric=False):
         self.req = [] # Store the requests
-        self.t_opt = {} # Store the optimal transportation times
+        self.t_opt = numpy.zeros((0, 0)) # Store the optimal transportation times (NP x NP matrix)
         self.vehicles = [] # Store the vehicles
+        self.spare_vehicles = [] # Vehicles left out while NR < NV (see load)
         self.NP = 0 # Number of all pickup/drop-off points
         self.NR = 0 # Number of requests
         self.NV = 0 # Number of vehicles
-        self.initial = ''  # Initial state is an empty string (empty list of tuples when we convert it)
+        self.initial = ()  # Initial state is an empty tuple of actions (see result)
         self.t_opt_min = INFINITY
+        # packed = True stores only the upper triangle of the transportation
+        # times (PackedMatrix), for point sets too large for a dense matrix
+        self.packed = packed
+        self.load_errors = [] # Malformed lines found while parsing (see validate)
+        self.t_opt_points = None # Points t_opt_min is computed over (None: all points)
+        # Lower bounds on the travel time between two points, used by h: t_opt
+        # itself or, with metric = True, its shortest-path closure (see metric_closure)
+        self.metric = metric
+        self.t_lb = self.t_opt
+        self.t_lb_tightened = numpy.zeros((0, 2), dtype=int)
+        # Per request (t_direct, t_depot, t_depot_lb), see preprocess
+        self.req_bounds = []
+        # Per number of passengers n, number of vehicles in use with at least
+        # n seats, i.e. that can carry a request of n passengers (see fit_vehicles)
+        self.fit_count = [0]
+        # Points ordered by transportation time from each point (see neighbours)
+        self.nn = {}
+        # If set, pickups are only tried with the candidate_k vehicles closest
+        # to the request's origin (faster, but the solution may not be optimal)
+        self.candidate_k = None
+        # Road graph (E section instead of P): edge list (p, q, t) and number of
+        # shortest-path rows kept by the roads.RoadMatrix t_opt
+        self.edges = None
+        self.road_cache_size = 128
+        # If > 0, h bounds road travel times with that many ALT landmarks
+        # (roads.Landmarks) instead of computing shortest-path rows
+        self.road_landmarks = 0
+        # If True, road travel times are answered by a roads.ContractionHierarchy
+        # (exact, no rows cached) instead of a roads.RoadMatrix
+        self.road_hierarchy = False
+        # Shared memory block holding t_opt, the requests and the vehicles
+        # (see share and load_shared), and whether this problem created it
+        self.shared = None
+        self.shared_owner = False
+        # Integer time mode: if set, every time (transportation and request
+        # times, hence action times, states and costs) is an integer number
+        # of ticks of 1/time_resolution time units, converted by preprocess
+        self.time_resolution = None
+        # Request indices by increasing request time (see pickup_window)
+        self.req_order = []
+        # If set, pickups are only tried for the requests made up to horizon
+        # (in the units of the times, ticks in integer time mode) after the
+        # earliest time a vehicle is free (see pickup_window)
+        self.horizon = None
+        # If True, search states are packed into bytes (see pack_state), about
+        # ten times smaller than tuples of actions, for very large searches
+        self.compact = False
+        # State being expanded and its summaries (see summary), reset whenever
+        # the requests or vehicles change: the same packed state can then
+        # stand for another plan
+        self.summary_cache = (None, None)
+        # 64-bit keys of the Zobrist hash of the states, per request and kind
+        # and per vehicle (see zobrist_keys)
+        self.zobrist = ([], [])
     
-    ''' Loads a problem from the opened file object fh. '''  
-    def load(self, fh):  
+    ''' Loads a problem from the opened file object fh. Unless validate is
+        False, the loaded problem is then checked with validate, and unless
+        preprocess is False, it is then preprocessed (see preprocess). '''  
+    def load(self, fh, validate=True, preprocess=True):  
         counter = 0
-        
-        # Read file line by line and store in a list
-        data = fh.readlines()
+        n_rows = None # Number of rows of transportation times read (None: no P section)
+        n_edges = None # Number of edges read (None: no E section)
+        self.load_errors = []
         
         # mode = 0 (do not read data), mode = 1 (read transportation times); 
-        # mode = 2 (read requests), mode = 3 (read vehicles)
+        # mode = 2 (read requests), mode = 3 (read vehicles), mode = 4 (read road edges)
         mode = 0 
         
-        # Iterate through the input file lines
-        for value in data:
+        # Iterate through the input file lines as they are read (single pass,
+        # the file is never held in memory as a whole)
+        for line, value in enumerate(fh, 1):
             v = value.split()
            
             # Check if line is relevant 
             if v != [] and v[0] != "#":
                 if v[0] == 'P': # Detect information about number of points 
                     self.NP = int(v[1])
+                    # Symmetric matrix with zero diagonal: T(p, p) = 0
+                    if self.packed:
+                        self.t_opt = PackedMatrix(self.NP)
+                    else:
+                        self.t_opt = numpy.zeros((self.NP, self.NP))
                     mode = 1
                     counter = 0
+                    n_rows = 0
+                
+                elif v[0] == 'E': # Detect information about number of points and road edges
+                    # Alternative to P: the road graph 'p q t' (one line per edge),
+                    # transportation times are then its shortest paths
+                    self.NP = int(v[1])
+                    self.edges = (numpy.zeros(int(v[2]), dtype=int),
+                                  numpy.zeros(int(v[2]), dtype=int),
+                                  numpy.zeros(int(v[2])))
+                    mode = 4
+                    counter = 0
+                    n_edges = 0
                 
                 elif v[0] == 'R': # Detect information about number of requests
                     self.NR = int(v[1])             
@@ -64,45 +333,88 @@ class FleetProblem(search.Problem):
                     counter = 0
                     
                 elif mode == 1: # Read transportation times
+                    # Tod: Transportation times from origin (counter) to dropoffs (counter+1, ...)
+                    # (whether they are valid, T(p, q) > 0, is checked by validate)
+                    n_rows += 1
+                    try:
+                        Tod = numpy.array(v, dtype=numpy.float64)
+                    except ValueError:
+                        self.load_errors.append(f"Line {line}: row {counter} of the transportation times is not numeric")
+                        counter += 1
+                        continue
+                    
+                    # Row p of the upper triangle has NP - 1 - p values
+                    expected = self.NP - 1 - counter
+                    if Tod.size != expected:
+                        self.load_errors.append(f"Row {counter} of the transportation times has {Tod.size} values, expected {max(expected, 0)}")
+                        Tod = Tod[: max(expected, 0)]
+                        if Tod.size == 0:
+                            counter += 1
+                            continue
+                    
+                    # Write the row straight into the preallocated matrix
                     count_aux = counter + 1
-                    for to in v:  
-                        # Tod: Transportation time from origin (counter) to dropoff (count_aux)
-                        Tod = float(to)
-                        
-                        # T(p, q) > 0 if p ̸= q (as is in the project handout)
-                        if Tod <= 0:
-                            raise Exception("Invalid transportation time")
-                
-                        self.t_opt[(counter, count_aux)] = Tod # (origin, dropoff) = (counter, count_aux)
-                        count_aux += 1
-                        
-                        if Tod < self.t_opt_min:
-                            self.t_opt_min = Tod
+                    if self.packed:
+                        k = self.t_opt.index(counter, count_aux)
+                        self.t_opt.data[k : k + Tod.size] = Tod
+                    else:
+                        self.t_opt[counter, count_aux : count_aux + Tod.size] = Tod
+                        self.t_opt[count_aux : count_aux + Tod.size, counter] = Tod # T(q, p) = T(p, q)
+                    
+                    if Tod.min() < self.t_opt_min:
+                        self.t_opt_min = float(Tod.min())
                             
                     counter += 1
                     
                 elif mode == 2: # Read requests
-                    req_time = float(v[0])
-                    
-                    # Valid requests have t (request time) ≥ 0 (as is in the project handout)
-                    if req_time < 0:
-                        raise Exception("Invalid request time")
-
-                    self.req.append((req_time, int(v[1]), int(v[2]), int(v[3]))) # (reqtime, origin, drop_off, num_p) 
+                    if len(v) != 4:
+                        self.load_errors.append(f"Request {counter} has {len(v)} values, expected 4")
+                    else:
+                        try:
+                            self.req.append((float(v[0]), int(v[1]), int(v[2]), int(v[3]))) # (reqtime, origin, drop_off, num_p) 
+                        except ValueError:
+                            self.load_errors.append(f"Line {line}: request {counter} is not numeric")
                     counter += 1
                     
                 elif mode == 3: # Read vehicles
-                    self.vehicles.append((int(v[0]), counter)) # capacity
+                    if len(v) != 1:
+                        self.load_errors.append(f"Vehicle {counter} has {len(v)} values, expected 1")
+                    else:
+                        try:
+                            self.vehicles.append((int(v[0]), counter)) # capacity
+                        except ValueError:
+                            self.load_errors.append(f"Line {line}: vehicle {counter} is not numeric")
                     counter += 1 
+                    
+                elif mode == 4: # Read road edges
+                    if len(v) != 3:
+                        self.load_errors.append(f"Edge {counter} has {len(v)} values, expected 3")
+                    elif counter < self.edges[0].size:
+                        try:
+                            self.edges[0][counter], self.edges[1][counter] = int(v[0]), int(v[1])
+                            self.edges[2][counter] = float(v[2])
+                        except ValueError:
+                            self.load_errors.append(f"Line {line}: edge {counter} is not numeric")
+                    counter += 1
+                    n_edges = counter
         
-        # Transportation time is 0 if origin == dropoff: T(p, p) = 0  (as is in the project handout)
-        for p in range(self.NP):
-            self.t_opt[(p, p)] = 0
+        # Every section must have as many lines as announced in its header
+        if n_rows is not None and n_rows != max(self.NP - 1, 0):
+            self.load_errors.append(f"Read {n_rows} rows of transportation times, expected {max(self.NP - 1, 0)}")
+        if n_edges is not None:
+            if n_edges != self.edges[0].size:
+                self.load_errors.append(f"Read {n_edges} edges, expected {self.edges[0].size}")
+            self.set_road_graph(*self.edges)
+        if len(self.req) != self.NR:
+            self.load_errors.append(f"Read {len(self.req)} requests, expected {self.NR}")
+        if len(self.vehicles) != self.NV:
+            self.load_errors.append(f"Read {len(self.vehicles)} vehicles, expected {self.NV}")
         
         # Initialize sorting of the vehicles list based on their capacity in descending order.
         # This ensures that higher-capacity vehicles are prioritized for usage.
         self.vehicles = sorted(self.vehicles, key=lambda x: (x[0]), reverse=True)
         if self.NR < self.NV:
+            self.spare_vehicles = self.vehicles[self.NR :]
             self.vehicles = self.vehicles[0 : self.NR]
             self.NV = self.NR
         
@@ -110,7 +422,619 @@ class FleetProblem(search.Problem):
         # In such cases, we trim the list of vehicles to match the number of requests,
         # ensuring that only the vehicles with the highest capacities are selected.
         # This prevents the allocation of unused vehicles and reduces the search space.
+        
+        if validate:
+            errors = self.validate()
+            if errors:
+                raise Exception("Invalid problem:\n" + "\n".join(errors))
+        
+        # Files without a P or E section (see load_mmap) are preprocessed by the
+        # caller, as are the others with preprocess = False (see load_file)
+        if preprocess and (n_rows is not None or n_edges is not None):
+            self.preprocess()
+
+    ''' Uses as transportation times the shortest paths of the road graph with
+        edges p[i] -- q[i] of travel time t[i] (see roads.RoadMatrix and
+        roads.ContractionHierarchy). hierarchy, if given, holds the arrays of
+        its contraction hierarchy (saved by save), so it is not contracted again. '''
+    def set_road_graph(self, p, q, t, hierarchy=None):
+        self.edges = (p, q, t)
+        graph = roads.road_graph(self.NP, p, q, t)
+        if self.road_hierarchy and hierarchy is not None:
+            self.t_opt = roads.hierarchy_from_arrays(hierarchy, 'ch_', graph)
+        elif self.road_hierarchy:
+            self.t_opt = roads.ContractionHierarchy(graph, range(self.NP))
+        else:
+            self.t_opt = roads.RoadMatrix(graph, self.NP, self.road_cache_size)
+        # No path is shorter than the shortest edge
+        self.t_opt_min = float(t.min()) if t.size else INFINITY
+
+    ''' Computes, once the problem is loaded, the data derived from it that
+        the search only reads: the lower bounds t_lb used by h, the static
+        bounds of each request req_bounds and the nearest-neighbour index nn. '''
+    def preprocess(self):
+        self.t_lb = self.t_opt
+        self.t_lb_tightened = numpy.zeros((0, 2), dtype=int)
+        # The closure needs the whole matrix, so it is not done for memory-mapped
+        # or shared problems, nor needed for road graphs (already shortest paths)
+        if self.metric and self.t_opt_points is None and self.edges is None and self.shared is None:
+            self.t_lb, self.t_lb_tightened = metric_closure(self.t_opt)
+        if self.edges is not None and self.road_landmarks > 0:
+            times = self.t_opt.t if isinstance(self.t_opt, FixedPointTimes) else self.t_opt
+            self.t_lb = roads.Landmarks(times.graph, self.road_landmarks, range(self.NP))
+        if self.time_resolution is not None:
+            self.to_ticks()
+        self.req_order = sorted(range(self.NR), key=self.order_key)
+        self.zobrist_keys()
+        self.summary_cache = (None, None)
+        
+        # Times that only depend on the request, for every request at once:
+        # t_direct = Tod(origin, drop_off), optimal transportation time of the request
+        # t_depot = T(0, origin), time for an unused vehicle to reach the origin
+        # t_depot_lb = lower bound on the time for any vehicle coming from point 0 (t_lb)
+        origin = numpy.array([r[1] for r in self.req], dtype=int)
+        drop_off = numpy.array([r[2] for r in self.req], dtype=int)
+        depot = numpy.zeros_like(origin)
+        # (float times, or int in integer time mode)
+        self.req_bounds = list(zip(numpy.asarray(self.t_opt[origin, drop_off]).tolist(),
+                                   numpy.asarray(self.t_opt[depot, origin]).tolist(),
+                                   numpy.asarray(self.t_lb[depot, origin]).tolist()))
+        self.fit_vehicles()
+        
+        # Row p: every point ordered by T(p, .), p itself first, in the smallest
+        # integer type that holds NP. Only candidate_k uses it: it is built at
+        # once for a dense matrix if candidate_k is already set, and row by row
+        # when needed otherwise (as for a shared matrix, so that each process
+        # does not hold an NP x NP copy)
+        self.nn = {}
+        if (self.candidate_k is not None and isinstance(self.t_opt, numpy.ndarray)
+                and self.t_opt_points is None and self.shared is None):
+            self.nn = numpy.argsort(self.t_opt, axis=1, kind='stable').astype(numpy.min_scalar_type(self.NP))
+
+    ''' t (a matrix indexed as t[o, d]) in integer ticks of 1/time_resolution:
+        converted at once if it is a dense or packed matrix in memory, and
+        rounded as it is read otherwise (see FixedPointTimes). '''
+    def ticks(self, t):
+        data = t.data if isinstance(t, PackedMatrix) else t
+        if self.in_ticks(t):
+            return t
+        if not isinstance(data, numpy.ndarray) or isinstance(data, numpy.memmap) or self.shared is not None:
+            return FixedPointTimes(t, self.time_resolution)
+        
+        ticks = numpy.rint(data * self.time_resolution).astype(numpy.int64)
+        if isinstance(t, PackedMatrix):
+            t = PackedMatrix(t.n, numpy.int64)
+            t.data = ticks
+            return t
+        return ticks
+
+    ''' True if the matrix t is already in ticks (see ticks). '''
+    def in_ticks(self, t):
+        data = t.data if isinstance(t, PackedMatrix) else t
+        return isinstance(t, FixedPointTimes) or (isinstance(data, numpy.ndarray) and numpy.issubdtype(data.dtype, numpy.integer))
+
+    ''' Integer time mode: converts the transportation times (t_opt, t_lb and
+        t_opt_min) and the request times to ticks (see ticks). Rounding each
+        time, instead of every sum of times, makes equal states equal strings. '''
+    def to_ticks(self):
+        t_opt = self.ticks(self.t_opt)
+        if t_opt is not self.t_opt and self.t_opt_min != INFINITY:
+            self.t_opt_min = int(numpy.rint(self.t_opt_min * self.time_resolution))
+        self.t_lb = t_opt if self.t_lb is self.t_opt else self.ticks(self.t_lb)
+        self.t_opt = t_opt
+        self.req = [(t if isinstance(t, int) else int(numpy.rint(t * self.time_resolution)), o, d, n)
+                    for t, o, d, n in self.req]
+
+    ''' Requests not picked up yet (status 0) whose pickup can be tried,
+        by increasing request time. With a planning horizon, only those made
+        up to horizon after t_idle (the earliest time a vehicle is free) or,
+        if none is, after the first of them. The requests are looked up in
+        req_order, which stops at the end of the window. '''
+    def pickup_window(self, status, t_idle):
+        window = []
+        end = INFINITY
+        for r_i in self.req_order:
+            if status[r_i] != 0:
+                continue
+            t_req = self.req[r_i][0]
+            if not window and self.horizon is not None:
+                end = max(t_idle, t_req) + self.horizon
+            elif t_req > end:
+                break
+            window.append(r_i)
+        return window
+
+    ''' Computes fit_count: for each number of passengers n (up to the largest
+        capacity or request), the number of vehicles in use with at least n
+        seats. As self.vehicles is sorted by capacity, the vehicles that can
+        carry request r are the first fit_count[n_pass of r]. '''
+    def fit_vehicles(self):
+        largest = max([c for c, _ in self.vehicles + self.spare_vehicles] + [r[3] for r in self.req], default=0)
+        self.fit_count = [0] * (max(largest, 0) + 1)
+        for capacity, _ in self.vehicles:
+            self.fit_vehicle(capacity, 1)
+
+    ''' Updates fit_count for a vehicle of the given capacity that starts
+        (change = 1) or stops (change = -1) being used: only its entries. '''
+    def fit_vehicle(self, capacity, change):
+        if capacity >= len(self.fit_count):
+            self.fit_count.extend([0] * (capacity + 1 - len(self.fit_count)))
+        for n in range(capacity + 1):
+            self.fit_count[n] += change
+
+    ''' Sort key of the requests in req_order: by request time, then index. '''
+    def order_key(self, r):
+        return (self.req[r][0], r)
+
+    ''' Position of request r in req_order (found by bisection). '''
+    def order_position(self, r):
+        return bisect.bisect_left(self.req_order, self.order_key(r), key=self.order_key)
+
+    ''' Points ordered by transportation time from point p (p itself first). '''
+    def neighbours(self, p):
+        if isinstance(self.nn, dict) and p not in self.nn:
+            row = self.t_opt[numpy.full(self.NP, p), numpy.arange(self.NP)]
+            self.nn[p] = numpy.argsort(row, kind='stable').astype(numpy.min_scalar_type(self.NP))
+        return self.nn[p]
+
+    ''' Indices of the (at most) k vehicles closest to point p, closest first,
+        among those with at least n_pass available seats.
+        at_point: point -> vehicles currently there; seats: vehicle -> seats. '''
+    def nearest_vehicles(self, p, at_point, seats, n_pass, k):
+        nearest = []
+        for q in self.neighbours(p):
+            for v_i in at_point.get(q, ()):
+                if seats[(v_i)] >= n_pass:
+                    nearest.append(v_i)
+                    if len(nearest) == k:
+                        return nearest
+        return nearest
+
+    ''' Checks the loaded problem, all at once over its arrays, and returns the
+        list of every violation found (empty if the problem is valid):
+        malformed lines, transportation times T(p, q) <= 0 for p != q,
+        request times < 0, points out of range, and requests with more
+        passengers than the largest vehicle can carry. matrix = False skips
+        the transportation times (e.g. for a memory-mapped matrix). '''
+    def validate(self, matrix=True, max_reported=10):
+        errors = list(self.load_errors)
+        
+        def report(what, mask, values):
+            bad = numpy.flatnonzero(mask)
+            if bad.size:
+                shown = ", ".join(values(i) for i in bad[:max_reported])
+                more = f" (and {bad.size - max_reported} more)" if bad.size > max_reported else ""
+                errors.append(f"{bad.size} {what}: {shown}{more}")
+        
+        if matrix and self.edges is not None:
+            # Road graph: edges between valid points, with T(p, q) > 0
+            p, q, t = self.edges
+            report("invalid road edges", (p < 0) | (p >= self.NP) | (q < 0) | (q >= self.NP) | ((p != q) & ~(t > 0)),
+                   lambda k: f"{p[k]} -- {q[k]} = {t[k]}")
+        
+        # T(p, q) > 0 if p ̸= q (as is in the project handout). Only the
+        # pairs reported are turned into (o, d): no index array of the size
+        # of the matrix is built
+        elif matrix and self.NP > 1:
+            if self.packed:
+                bad = numpy.flatnonzero(~(self.t_opt.data > 0))
+                o, d = self.t_opt.pair(bad)
+            else:
+                mask = ~(self.t_opt > 0)
+                numpy.fill_diagonal(mask, False)
+                o, d = numpy.nonzero(mask)
+                del mask
+                o, d = o[o < d], d[o < d]
+            report("invalid transportation times", numpy.ones(o.size, dtype=bool),
+                   lambda k: f"T({o[k]}, {d[k]}) = {self.t_opt[o[k], d[k]]}")
+        
+        vehicles = self.vehicles + self.spare_vehicles
+        capacities = numpy.array([c for c, _ in vehicles])
+        report("vehicles without seats", capacities <= 0,
+               lambda i: f"vehicle {vehicles[i][1]} with capacity {capacities[i]}")
+        
+        if self.req:
+            req = numpy.array(self.req, dtype=numpy.float64)
+            t_req, points, n_pass = req[:, 0], req[:, 1:3], req[:, 3]
+            capacity = capacities.max(initial=0)
+            
+            # Valid requests have t (request time) ≥ 0 (as is in the project handout)
+            report("invalid request times", ~(t_req >= 0),
+                   lambda i: f"request {i} at t = {t_req[i]}")
+            report("requests with points out of range", ((points < 0) | (points >= self.NP)).any(axis=1),
+                   lambda i: f"request {i} from {int(points[i, 0])} to {int(points[i, 1])}")
+            report("requests that no vehicle can carry", (n_pass <= 0) | (n_pass > capacity),
+                   lambda i: f"request {i} with {int(n_pass[i])} passengers")
+            
+            if matrix and self.edges is not None:
+                # Every point of a request must be reachable on the road graph from point 0
+                in_range = ((points >= 0) & (points < self.NP)).all(axis=1)
+                reach = self.t_opt.row(0)[numpy.where(in_range[:, None], points, 0).astype(int)]
+                report("requests not reachable from point 0", in_range & numpy.isinf(reach).any(axis=1),
+                       lambda i: f"request {i} from {int(points[i, 0])} to {int(points[i, 1])}")
+            
+        return errors
+
+    ''' Saves the loaded problem to the binary (.npz) file path. source_hash
+        identifies the .dat file it was compiled from, and validated tells
+        whether the problem was checked by validate when it was loaded.
+        The times are saved as read: in integer time mode, the problem must
+        be saved before preprocess converts them to ticks (see load_file). '''
+    def save(self, path, source_hash='', validated=True):
+        if self.in_ticks(self.t_opt):
+            raise Exception("Save the problem with float times: before preprocess in integer time mode")
+        # Road graphs are saved as their edge list instead, with their
+        # contraction hierarchy if they have one
+        edges = self.edges if self.edges is not None else (numpy.zeros(0, dtype=int),) * 2 + (numpy.zeros(0),)
+        times = self.t_opt.t if isinstance(self.t_opt, FixedPointTimes) else self.t_opt
+        hierarchy = times.arrays('ch_') if isinstance(times, roads.ContractionHierarchy) else {}
+        if self.edges is not None:
+            t_upper = numpy.zeros(0)
+        elif self.packed:
+            t_upper = self.t_opt.data
+        else:
+            # Row by row: no index array of the size of the matrix is built
+            t_upper = numpy.zeros(self.NP * (self.NP - 1) // 2, dtype=self.t_opt.dtype)
+            k = 0
+            for p in range(self.NP - 1):
+                t_upper[k : k + self.NP - 1 - p] = self.t_opt[p, p + 1 :]
+                k += self.NP - 1 - p
+
+        # Written next to path and then moved over it, so that path is never
+        # left half written (killed run, another process loading it)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'wb') as fh:
+                numpy.savez(fh,
+                            header=numpy.array([self.NP, self.NR, self.NV]),
+                            source_hash=numpy.array(source_hash),
+                            validated=numpy.array(validated),
+                            t_upper=t_upper,
+                            req_time=numpy.array([r[0] for r in self.req], dtype=numpy.float64),
+                            req_points=numpy.array([r[1:] for r in self.req], dtype=numpy.int64).reshape(-1, 3),
+                            vehicles=numpy.array(self.vehicles, dtype=numpy.int64).reshape(-1, 2),
+                            spare_vehicles=numpy.array(self.spare_vehicles, dtype=numpy.int64).reshape(-1, 2),
+                            road=numpy.array(self.edges is not None),
+                            edge_p=edges[0], edge_q=edges[1], edge_t=edges[2],
+                            **hierarchy)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    ''' Loads a problem from the binary (.npz) file path written by save.
+        It is not validated again: save only sees problems already loaded. '''
+    def load_compiled(self, path):
+        with numpy.load(path, allow_pickle=False) as data:
+            self.NP, self.NR, self.NV = (int(x) for x in data['header'])
+            t_upper = data['t_upper']
+
+            if 'road' in data.files and bool(data['road']):
+                hierarchy = data if 'ch_rank' in data.files else None
+                self.set_road_graph(data['edge_p'], data['edge_q'], data['edge_t'], hierarchy)
+            elif self.packed:
+                self.t_opt = PackedMatrix(self.NP)
+                self.t_opt.data = t_upper
+            else:
+                self.t_opt = numpy.zeros((self.NP, self.NP))
+                i, j = numpy.triu_indices(self.NP, 1)
+                self.t_opt[i, j] = t_upper
+                self.t_opt[j, i] = t_upper
+            if self.edges is None:
+                self.t_opt_min = float(t_upper.min()) if t_upper.size else INFINITY
+
+            # (reqtime, origin, drop_off, num_p), with the same types as load
+            self.req = [(t, o, d, n) for t, (o, d, n) in
+                        zip(data['req_time'].tolist(), data['req_points'].tolist())]
+            # Vehicles are saved already sorted and trimmed: (capacity, index)
+            self.vehicles = [tuple(v) for v in data['vehicles'].tolist()]
+            if 'spare_vehicles' in data.files:
+                self.spare_vehicles = [tuple(v) for v in data['spare_vehicles'].tolist()]
+        
+        self.preprocess()
+
+    ''' Saves the transportation times alone to the .npy file path, as the
+        dense NP x NP matrix or, for packed problems, the flat upper triangle.
+        The file can then be opened with load_mmap. '''
+    def save_matrix(self, path):
+        if self.edges is not None:
+            raise Exception("Road graph problems have no precomputed matrix")
+        with open(path, 'wb') as fh:
+            if self.packed:
+                numpy.save(fh, self.t_opt.data)
+            else:
+                numpy.save(fh, self.t_opt)
+
+    ''' Loads a problem whose transportation times are in the precomputed
+        .npy file path (see save_matrix), memory-mapped instead of read into
+        memory, and whose requests and vehicles are read from the opened file
+        object fh (a .dat file with only the R and V sections). Only the pages
+        of the matrix holding the points used by the requests are read. '''
+    def load_mmap(self, path, fh, validate=True):
+        t_opt = numpy.load(path, mmap_mode='r')
+        if t_opt.ndim == 1:
+            # Flat upper triangle: len = NP*(NP-1)/2
+            self.NP = int(round((1 + numpy.sqrt(1 + 8 * t_opt.shape[0])) / 2))
+            self.t_opt = PackedMatrix(self.NP)
+            self.t_opt.data = t_opt
+            self.packed = True
+        else:
+            self.NP = t_opt.shape[0]
+            self.t_opt = t_opt
+            self.packed = False
+
+        mapped = self.t_opt
+        self.load(fh, validate=False)
+        if self.t_opt is not mapped:
+            raise Exception("Transportation times must come from the mapped matrix only")
+        
+        # The precomputed matrix is trusted: only requests and vehicles are checked
+        if validate:
+            errors = self.validate(matrix=False)
+            if errors:
+                raise Exception("Invalid problem:\n" + "\n".join(errors))
+
+        # Minimum transportation time among the points that can be visited
+        # (depot and request points), so that the rest of the matrix is never read
+        points = numpy.unique([0] + [p for r in self.req for p in r[1:3]])
+        self.t_opt_points = set(points.tolist()) # kept up to date by add_request
+        if points.size > 1:
+            o, d = numpy.triu_indices(points.size, 1)
+            self.t_opt_min = float(numpy.min(self.t_opt[points[o], points[d]]))
+        
+        self.preprocess()
+
+    ''' Layout of a shared memory block (see share): the header
+        [NP, NR, NV, number of spare vehicles, packed, t_opt_min], then the
+        arrays (name, dtype, shape) one after the other. '''
+    def shared_layout(self, header):
+        NP, NR, NV, NS, packed = (int(x) for x in header[:5])
+        t_shape = (NP * (NP - 1) // 2,) if packed else (NP, NP)
+        return [('header', numpy.float64, (6,)),
+                ('t_opt', numpy.float64, t_shape),
+                ('req_time', numpy.float64, (NR,)),
+                ('req_points', numpy.int64, (NR, 3)),
+                ('vehicles', numpy.int64, (NV, 2)),
+                ('spare_vehicles', numpy.int64, (NS, 2))]
+
+    ''' Arrays of the shared memory block self.shared, without copying it '''
+    def shared_arrays(self):
+        header = numpy.ndarray((6,), dtype=numpy.float64, buffer=self.shared.buf)
+        arrays = {}
+        offset = 0
+        for name, dtype, shape in self.shared_layout(header):
+            arrays[name] = numpy.ndarray(shape, dtype=dtype, buffer=self.shared.buf, offset=offset)
+            offset += arrays[name].nbytes
+        return arrays
+
+    ''' Backs the problem with its shared memory block: t_opt becomes a view
+        of the block, and the requests and vehicles are read from it. '''
+    def attach_shared(self):
+        arrays = self.shared_arrays()
+        header = arrays['header']
+        self.NP, self.NR, self.NV = (int(x) for x in header[:3])
+        self.packed = bool(header[4])
+        self.t_opt_min = float(header[5])
+        if self.packed:
+            self.t_opt = PackedMatrix(self.NP)
+            self.t_opt.data = arrays['t_opt']
+        else:
+            self.t_opt = arrays['t_opt']
+        
+        # Requests and vehicles are small: the lists the search uses are built from the block
+        self.req = [(t, o, d, n) for t, (o, d, n) in
+                    zip(arrays['req_time'].tolist(), arrays['req_points'].tolist())]
+        self.vehicles = [tuple(v) for v in arrays['vehicles'].tolist()]
+        self.spare_vehicles = [tuple(v) for v in arrays['spare_vehicles'].tolist()]
+        self.preprocess()
+
+    ''' Copies the loaded problem (transportation times, requests and vehicles)
+        to a new shared memory block, which then backs this problem too, and
+        returns the name of the block. Other processes attach to it with
+        load_shared(name), all reading the same copy of the matrix. The block
+        is freed by close_shared of this problem. '''
+    def share(self):
+        if self.edges is not None:
+            raise Exception("Road graph problems have no precomputed matrix to share")
+        if self.time_resolution is not None:
+            raise Exception("Share the problem with float times: each process can then set time_resolution before load_shared")
+        if self.shared is not None:
+            return self.shared.name
+        
+        header = numpy.array([self.NP, self.NR, self.NV, len(self.spare_vehicles),
+                              self.packed, self.t_opt_min], dtype=numpy.float64)
+        size = sum(numpy.dtype(dtype).itemsize * int(numpy.prod(shape))
+                   for _, dtype, shape in self.shared_layout(header))
+        self.shared = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.shared_owner = True
+        
+        # The layout of the rest of the block is read from its header
+        numpy.ndarray((6,), dtype=numpy.float64, buffer=self.shared.buf)[:] = header
+        arrays = self.shared_arrays()
+        arrays['t_opt'][:] = self.t_opt.data if self.packed else self.t_opt
+        arrays['req_time'][:] = [r[0] for r in self.req]
+        arrays['req_points'][:] = numpy.array([r[1:] for r in self.req], dtype=numpy.int64).reshape(-1, 3)
+        arrays['vehicles'][:] = numpy.array(self.vehicles, dtype=numpy.int64).reshape(-1, 2)
+        arrays['spare_vehicles'][:] = numpy.array(self.spare_vehicles, dtype=numpy.int64).reshape(-1, 2)
+        self.attach_shared()
+        return self.shared.name
+
+    ''' Loads a problem from the shared memory block name created by share
+        (e.g. in another process), without copying the transportation times.
+        The problem is not validated again: share only sees loaded problems.
+        The block is not tracked by this process, so that it is not freed when
+        this process exits: only the problem that created it frees it. '''
+    def load_shared(self, name):
+        try:
+            self.shared = shared_memory.SharedMemory(name=name, track=False) # Python >= 3.13
+        except TypeError:
+            self.shared = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.shared._name, 'shared_memory')
+        self.shared_owner = False
+        self.attach_shared()
+
+    ''' Detaches the problem from its shared memory block, and frees the block
+        if this problem created it. The problem cannot be used afterwards. '''
+    def close_shared(self):
+        if self.shared is None:
+            return
+        # The views of the block must be gone before it is closed
+        self.t_opt = self.t_lb = None
+        self.nn = {}
+        self.shared.close()
+        if self.shared_owner:
+            # Problems attached in processes sharing this resource tracker may
+            # have stopped tracking the block (see load_shared)
+            resource_tracker.register(self.shared._name, 'shared_memory')
+            try:
+                self.shared.unlink()
+            except FileNotFoundError:
+                # Already freed (e.g. by the resource tracker of a process that
+                # attached it without load_shared): only stop tracking it
+                resource_tracker.unregister(self.shared._name, 'shared_memory')
+        self.shared = None
+
+    ''' Loads a problem from the .dat file path, going through its compiled
+        form path + '.npz'. The compiled file is (re)built whenever it is
+        missing or unreadable (e.g. truncated), when the content of the .dat
+        file has changed, when it was compiled without validation but
+        validate is True, and when it has no contraction hierarchy but
+        road_hierarchy is True. It is written to a temporary file first, and
+        if it cannot be written (e.g. read-only directory), the problem is
+        loaded without it. '''
+    def load_file(self, path, cache=True, validate=True):
+        source_hash = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b''):
+                source_hash.update(chunk)
+        source_hash = source_hash.hexdigest()
+        compiled = path + '.npz'
+
+        if cache and os.path.exists(compiled):
+            try:
+                with numpy.load(compiled, allow_pickle=False) as data:
+                    valid = str(data['source_hash']) == source_hash
+                    # Files compiled before the flag existed were always validated
+                    validated = 'validated' not in data.files or bool(data['validated'])
+                    # Road graphs are only contracted once (see set_road_graph)
+                    if self.road_hierarchy and 'road' in data.files and bool(data['road']):
+                        valid = valid and 'ch_rank' in data.files
+                if valid and (validated or not validate):
+                    self.load_compiled(compiled)
+                    return
+            except (zipfile.BadZipFile, OSError, KeyError, ValueError, EOFError):
+                # Unreadable (e.g. truncated): compiled again from the .dat file
+                self.req, self.vehicles, self.spare_vehicles = [], [], []
+
+        # Saved before preprocess, which converts the times to ticks in
+        # integer time mode: the compiled file always holds the times as read
+        with open_dat(path) as fh:
+            self.load(fh, validate, preprocess=False)
+        if cache:
+            try:
+                self.save(compiled, source_hash, validate)
+            except OSError:
+                pass # Loaded all the same, only not cached
+        if self.NP > 0 or self.edges is not None:
+            self.preprocess()
                     
+    ''' Adds the request (t, o, d, n) with index NR, without reloading the
+        problem, and brings back the largest spare vehicle if there are now
+        fewer vehicles than requests. Returns the index of the request.
+        In integer time mode, t is converted to ticks as the loaded times.
+        Only the data of the request and of the vehicle brought back change:
+        req_order and the vehicle lists are searched by bisection, and only
+        the list insertions (memory moves) depend on NR and NV. '''
+    def add_request(self, t, o, d, n):
+        if t < 0 or not (0 <= o < self.NP and 0 <= d < self.NP):
+            raise Exception("Invalid request")
+        # Largest vehicles first, in use or spare
+        largest = max([v[0] for v in self.vehicles[:1] + self.spare_vehicles[:1]], default=0)
+        if n <= 0 or n > largest:
+            raise Exception("No vehicle can carry the request")
+        
+        t = float(t) if self.time_resolution is None else int(numpy.rint(t * self.time_resolution))
+        self.req.append((t, int(o), int(d), int(n))) # (reqtime, origin, drop_off, num_p)
+        self.summary_cache = (None, None)
+        bisect.insort(self.req_order, self.NR, key=self.order_key)
+        self.req_bounds.append((numpy.asarray(self.t_opt[o, d]).item(), numpy.asarray(self.t_opt[0, o]).item(),
+                                numpy.asarray(self.t_lb[0, o]).item()))
+        self.NR += 1
+        self.zobrist_keys()
+        
+        if self.spare_vehicles and self.NV < self.NR:
+            self.vehicles.append(self.spare_vehicles.pop(0)) # No larger than any vehicle in use
+            self.NV += 1
+            self.fit_vehicle(self.vehicles[-1][0], 1)
+        
+        # Memory-mapped problems only take the minimum over the points in use
+        if self.t_opt_points is not None:
+            points = list(self.t_opt_points)
+            for p in (o, d):
+                if p not in self.t_opt_points:
+                    self.t_opt_min = min(self.t_opt_min, numpy.min(self.t_opt[[p] * len(points), points]).item())
+                    self.t_opt_points.add(p)
+                    points.append(p)
+        return self.NR - 1
+
+    ''' Adds a vehicle with the given capacity, without reloading the problem.
+        As in load, only the NR vehicles with the highest capacities are used,
+        the others are kept as spare. Returns the index of the vehicle.
+        As in add_request, only the entries of fit_count up to the capacities
+        of the vehicles that change are updated. '''
+    def add_vehicle(self, capacity):
+        if capacity <= 0:
+            raise Exception("Invalid vehicle capacity")
+        
+        vehicle = (int(capacity), len(self.vehicles) + len(self.spare_vehicles))
+        self.summary_cache = (None, None)
+        by_capacity = lambda x: -x[0]
+        
+        if self.NV < self.NR:
+            bisect.insort(self.vehicles, vehicle, key=by_capacity)
+            self.NV += 1
+            self.fit_vehicle(vehicle[0], 1)
+        elif self.vehicles and capacity > self.vehicles[-1][0]:
+            # Replaces the smallest vehicle in use, which becomes the largest spare
+            self.spare_vehicles.insert(0, self.vehicles.pop())
+            self.fit_vehicle(self.spare_vehicles[0][0], -1)
+            bisect.insort(self.vehicles, vehicle, key=by_capacity)
+            self.fit_vehicle(vehicle[0], 1)
+        else:
+            bisect.insort(self.spare_vehicles, vehicle, key=by_capacity)
+        
+        self.zobrist_keys()
+        return vehicle[1]
+
+    ''' Removes request i (e.g. cancelled or served outside the search). The
+        last request takes its index, so that the others keep theirs, and the
+        smallest vehicle in use becomes spare if there are now more vehicles
+        than requests. Returns the previous index of the moved request.
+        As in add_request, req_order is searched by bisection. '''
+    def retire_request(self, i):
+        if not 0 <= i < self.NR:
+            raise IndexError("Request index out of range")
+        
+        last = self.NR - 1
+        self.summary_cache = (None, None)
+        self.req_order.pop(self.order_position(i))
+        if i != last:
+            # The last request is moved to index i (see order_key)
+            self.req_order.pop(self.order_position(last))
+        self.req[i] = self.req[last]
+        self.req.pop()
+        if i != last:
+            bisect.insort(self.req_order, i, key=self.order_key)
+        self.req_bounds[i] = self.req_bounds[last]
+        self.req_bounds.pop()
+        self.NR -= 1
+        
+        if self.NV > self.NR:
+            self.spare_vehicles.insert(0, self.vehicles.pop())
+            self.NV -= 1
+            self.fit_vehicle(self.spare_vehicles[0][0], -1)
+        return last
+
     ''' Compute cost of solution sol.  '''       
     def cost(self, sol):
         cost = 0  
@@ -127,10 +1051,10 @@ class FleetProblem(search.Problem):
             pic_drop, _, r_i, td = action
             
             if pic_drop == 'Dropoff':
-                t_req, origin, drop_off, _  = self.req[r_i]
+                t_req = self.req[r_i][0]
                 
                 # Get Tod of the request
-                Tod = self.Tod(origin, drop_off)
+                Tod = self.req_bounds[r_i][0]
                 
                 # Request Cost = Delay = 
                 # = Dropoff time of an action (td) -
@@ -140,85 +1064,200 @@ class FleetProblem(search.Problem):
                    
         return cost 
     
+    ''' Packs the plan (tuple of actions) of a state into bytes: first the
+        status (2 bits: 0 none, 1 picked up, 2 dropped off) and the vehicle of
+        every request, as one integer bitfield, then the times of its pickup
+        and dropoff, for the requests with actions, as an array of doubles
+        (of int64 ticks in integer time mode). Bytes are hashable and
+        orderable, so the packed state is used as it is by the search. '''
+    def pack_state(self, plan):
+        vehicle_bits = max(1, max([v_i for _, v_i in self.vehicles], default=0).bit_length())
+        fields = 0
+        times = {}
+        for pic_drop, v_i, r_i, t in plan:
+            shift = r_i * (2 + vehicle_bits)
+            if pic_drop == 'Pickup':
+                fields |= (1 | v_i << 2) << shift
+                times.setdefault(r_i, [t, t])[0] = t
+            else:
+                fields = fields & ~(3 << shift) | (2 | v_i << 2) << shift
+                times.setdefault(r_i, [t, t])[1] = t
+        
+        n_bytes = (self.NR * (2 + vehicle_bits) + 7) // 8
+        typecode = 'd' if self.time_resolution is None else 'q'
+        packed_times = array(typecode, [t for r_i in sorted(times) for t in times[r_i]])
+        return fields.to_bytes(n_bytes, 'little') + packed_times.tobytes()
+
+    ''' The plan (tuple of actions, sorted as by result) of a packed state. '''
+    def unpack_state(self, packed):
+        vehicle_bits = max(1, max([v_i for _, v_i in self.vehicles], default=0).bit_length())
+        n_bytes = (self.NR * (2 + vehicle_bits) + 7) // 8
+        fields = int.from_bytes(packed[:n_bytes], 'little')
+        times = array('d' if self.time_resolution is None else 'q', packed[n_bytes:])
+        
+        plan = []
+        k = 0
+        for r_i in range(self.NR):
+            field = fields >> (r_i * (2 + vehicle_bits)) & ((1 << (2 + vehicle_bits)) - 1)
+            status, v_i = field & 3, field >> 2
+            if status > 0:
+                plan.append(('Pickup', v_i, r_i, times[k]))
+                if status == 2:
+                    plan.append(('Dropoff', v_i, r_i, times[k + 1]))
+                k += 2
+        return tuple(sorted(plan, key=action_order))
+
+    ''' The plan (tuple of actions) of a state: a FleetState, a packed state
+        or a plan itself. '''
+    def plan(self, state):
+        if isinstance(state, FleetState):
+            return state.plan()
+        return self.unpack_state(state) if isinstance(state, bytes) else state
+
+    ''' Extends the keys of the Zobrist hash (see zobrist_key) to the current
+        requests and vehicles: zobrist[0][2 * r + kind] for request r and kind
+        0 (pickup) or 1 (dropoff), zobrist[1][v] for vehicle index v. A key
+        only depends on its index, so the existing keys are kept and only
+        those of new requests or vehicles are computed. '''
+    def zobrist_keys(self):
+        request_keys, vehicle_keys = self.zobrist
+        n_ids = len(self.vehicles) + len(self.spare_vehicles)
+        request_keys.extend(splitmix64(2 * i) for i in range(len(request_keys), 2 * self.NR))
+        vehicle_keys.extend(splitmix64(2 * i + 1) for i in range(len(vehicle_keys), n_ids))
+
+    ''' Zobrist key of action: the keys of its (request, kind) and vehicle and
+        its time (the ticks in integer time mode, hash(t) for a float), mixed
+        by splitmix64. '''
+    def zobrist_key(self, action):
+        pic_drop, v_i, r_i, t = action
+        request_keys, vehicle_keys = self.zobrist
+        key = request_keys[2 * r_i + (pic_drop == 'Dropoff')] ^ vehicle_keys[v_i]
+        return splitmix64(key ^ hash(t) & MASK64)
+
+    ''' The FleetState before any action. '''
+    def initial_state(self):
+        return FleetState(None, None)
+
+    ''' The FleetState that results from executing action in the FleetState
+        state: it only stores the action, and its hash is state's XOR the key
+        of the action (see zobrist_key). '''
+    def extend(self, state, action):
+        return FleetState(state, action, state.hash ^ self.zobrist_key(action))
+
+    ''' Executes action on the summaries vehicles and status (see summary), in place. '''
+    def apply(self, vehicles, status, action):
+        pic_drop, v_i, r_i, t = action
+        
+        _, origin, drop_off, n_pass = self.req[r_i]
+        _, _, seats, onboard = vehicles[(v_i)]
+        if pic_drop == 'Pickup':
+            vehicles[(v_i)] = (origin, t, seats - n_pass, onboard + (action,))
+        else:
+            vehicles[(v_i)] = (drop_off, t, seats + n_pass, tuple(a for a in onboard if a[2] != r_i))
+        status[r_i] += 1
+
+    ''' Summaries of the plan of a state (a FleetState, a packed state or a
+        plan), which actions and h read instead of the plan:
+        vehicles: vehicle index -> (point, time, seats, onboard), the point and
+        time of its last action (None and 0 if it has not been used yet), its
+        free seats and the pickups of the requests it carries;
+        status: per request, 0 (waiting), 1 (picked up) or 2 (dropped off).
+        They are not stored in the states: those of the state being expanded
+        are kept by actions, and those of its children (for h) are computed
+        from them. Otherwise they are computed from the whole plan. '''
+    def summary(self, state):
+        cached, summary = self.summary_cache
+        if cached is not None:
+            if cached is state or cached == state:
+                return summary
+            if isinstance(state, FleetState) and state.parent is cached:
+                vehicles, status = summary[0].copy(), summary[1].copy()
+                self.apply(vehicles, status, state.action)
+                return vehicles, status
+        
+        vehicles = {(v_i): (None, 0, capacity, ()) for capacity, v_i in self.vehicles}
+        status = [0] * self.NR
+        for action in self.plan(state):
+            self.apply(vehicles, status, action)
+        return vehicles, status
+
     ''' Return the state that results from executing
         the given action in the given state '''
     def result(self, state, action):
-        # We use as state a string in order to use explored.add(node.state)
-        # However state can only be manipulated in list of tuples format
-        state = str_to_list_of_tuples(state)
-        state.append(action)
-    
-        # Sort state in order to ensure the correct working of the priority queue (without duplicates)
-        state = sorted(state, key=lambda x: (x[3], x[0][0], x[1], x[2]))
-        return list_of_tuples_to_str(state)
+        if self.compact:
+            return self.pack_state(self.plan(state) + (action,))
+        if not isinstance(state, FleetState):
+            # A plan: the chain of states of its actions
+            plan, state = state, self.initial_state()
+            for previous in plan:
+                state = self.extend(state, previous)
+        return self.extend(state, action)
         
     ''' Return the actions that can be executed in the given state. '''
     def actions(self, state):
         R = []
         
-        available_seats = {}
+        # Point, time and available seats of each vehicle, and status of each
+        # request (see summary), kept while the children of state are evaluated
+        vehicles, status = self.summary(state)
+        self.summary_cache = (state, (vehicles, status))
         
-        for seats, v_i in self.vehicles:
-            available_seats[(v_i)] = seats
+        all_vehicles = [v_i for _, v_i in self.vehicles]
+        if self.candidate_k is not None:
+            at_point = {}
+            available_seats = {}
+            for v_i in all_vehicles:
+                point, _, seats, _ = vehicles[(v_i)]
+                at_point.setdefault(0 if point is None else point, []).append(v_i)
+                available_seats[(v_i)] = seats
 
-        req_status = [[0,-1] for __ in range(self.NR)]  # status of each request [0,1]
-        # (0): status of requirements 0 (start), 1 (picked up), 2 (finished)
-        # (1): index of the vehicle in charge of the request
-        
-        state = str_to_list_of_tuples(state)
-        
-        # Get the number of currently available seats in each vehicle, the 
-        # status of each request and the index of the vehicle associated with each request
-        for s in state:
-            req_status[s[2]][0] +=1
-            if s[0] == 'Pickup':
-                req_status[s[2]][1] = s[1]
-                available_seats[(s[1])] -= self.req[s[2]][3]
-            else:
-                available_seats[(s[1])] += self.req[s[2]][3]
-
-        # R gets the feasible requests' actions available to be executed
-        for index,request in enumerate(self.req):
-            if(req_status[index][0] == 0):
-                R.append(('Pickup', index))
-            elif(req_status[index][0] == 1):
-                R.append(('Dropoff', index))
+        # R gets the feasible requests' actions available to be executed:
+        # dropoffs of the requests on board (by the vehicle carrying them),
+        # and pickups in the window
+        for v_i, (_, _, _, onboard) in vehicles.items():
+            for pickup in onboard:
+                R.append(('Dropoff', pickup[2], v_i))
+        t_idle = min([time for _, time, _, _ in vehicles.values()], default=0)
+        for index in self.pickup_window(status, t_idle):
+            R.append(('Pickup', index, None))
                 
         actions = []
         for request in R:
-            for _, indexV in self.vehicles:
+            if request[0] == 'Dropoff':
+                # Only the vehicle that picked the request up
+                candidates = [request[2]]
+            elif self.candidate_k is not None:
+                candidates = self.nearest_vehicles(self.req[request[1]][1], at_point, available_seats,
+                                                   self.req[request[1]][3], self.candidate_k)
+            else:
+                # Only the vehicles whose capacity fits the request (see fit_vehicles)
+                candidates = all_vehicles[: self.fit_count[self.req[request[1]][3]]]
+            for indexV in candidates:
+                # Location and time of the vehicle's last action
+                point_j, t_j, seats, _ = vehicles[(indexV)]
+                
                 # Check if vehicle is appropriate for this specific task:
                 # In pickups check if the vehicle has available seats
-                # In dropoffs check if this is the same vehicle that is performing that request
-                if (request[0] == 'Dropoff' and indexV == req_status[request[1]][1]) or \
-                    (request[0] == 'Pickup' and available_seats[(indexV)] >= self.req[request[1]][3]):
-                    
-                    # Save the vehicle's last action
-                    action_j = []
-                    for st_action in reversed(state):
-                        if st_action[1] == indexV:
-                            action_j.append(st_action)
-                            break
+                # (in dropoffs it is the vehicle performing that request)
+                if request[0] == 'Dropoff' or seats >= self.req[request[1]][3]:
                     
                     # Check if vehicle has ever been used
-                    if action_j == []:
-                        new_action_point = self.req[request[1]][1] # Get origin from request, because always 'Pickup'
-                        t = max(self.t_opt[(0, new_action_point)], self.req[request[1]][0]) 
+                    if point_j is None:
+                        # Always a 'Pickup': time from point 0 to the request's origin (static bound)
+                        t = max(self.req_bounds[request[1]][1], self.req[request[1]][0]) 
                         # t = max(time from point 0 to new action's point, t_req)
                     else: 
-                        if action_j[0][0] == 'Pickup':
-                            action_j_point = self.req[action_j[0][2]][1] # Get origin from request (location where the vehicle is right now)
-                        else:
-                            action_j_point = self.req[action_j[0][2]][2] # Get destiny from request (location where the vehicle is right now)
-                        
                         if request[0] == 'Pickup':
                             new_action_point = self.req[request[1]][1] # Get origin from request (location where the vehicle will be after the new action)
                         else:
                             new_action_point = self.req[request[1]][2] # Get destiny from request (location where the vehicle will be after the new action)
                             
                         # t = max(t_drop/pick_j + time from point j to new action's point , t_req)
-                        t = max(action_j[0][3] + self.Tod(action_j_point, new_action_point), self.req[request[1]][0])
+                        t = max(t_j + self.Tod(point_j, new_action_point), self.req[request[1]][0])
                             
+                    # Plain Python times: numpy scalars would end up in the states and the plan
+                    if isinstance(t, numpy.generic):
+                        t = t.item()
                     actions.append((request[0], indexV, request[1], t))
                     # action = (pickup/dropoff, vehicle index, request index, time)
 
@@ -226,57 +1265,39 @@ class FleetProblem(search.Problem):
     
     ''' Return True if the state is a goal. ''' 
     def goal_test(self, state):
-        state = str_to_list_of_tuples(state)
+        n_actions = len(state) if isinstance(state, FleetState) else len(self.plan(state))
         # Solution is complete if it has number of elements = 2 * number of requests,
         # i.e, a pickup and a dropoff per request
-        return len(state) == len(self.req) * 2
+        return n_actions == len(self.req) * 2
     
     ''' Return the cost of a solution path that arrives at state2. '''
     def path_cost(self, c, state1, action, state2):
-        return self.cost(str_to_list_of_tuples(state2)) 
+        # Only a dropoff adds to the cost (see cost): that of its request
+        return c + self.cost([action])
     
     def Tod(self, o, d):
-        if o < d:
-            return self.t_opt[(o, d)]
-        else:
-            return self.t_opt[(d, o)]
+        return self.t_opt[o, d]
+    
+    ''' Lower bound on the time a vehicle needs to go from o to d, possibly
+        through other points (see preprocess). '''
+    def Tlb(self, o, d):
+        return self.t_lb[o, d]
     
     def h(self, state):
         ''' Return the heuristic value for the given state.'''
         # Given node n returns a cost estimate of the cheapest path from n to a goal node
         
-        # Convert state from string to list of tuples
-        current_state = str_to_list_of_tuples(state.state)
+        vehicles, status_req = self.summary(state.state)
             
         cost = 0
-        status_req = [0 for _ in self.req] 
         # status_req 
         # (0): Pickup not done yet; (1): Pickup already done; (2): Dropoff already done; 
         
-        veh_status = {} # Last action performed by the vehicle
-        veh_pic_status = {} # For each vehicle, save the request in course (pickup done, dropoff not done)
-        valid_vehicle_index = [t[1] for t in self.vehicles]
-        for index in valid_vehicle_index:
-            veh_status[(index)] = []
-            veh_pic_status[(index)] = []
+        # For each vehicle: point and time of its last action, free seats and
+        # the requests in course (pickup done, dropoff not done), see summary
         
         # We consider as heuristic the sum of [1] and [2]:
         
-        # Setup
-        for action in current_state:
-            pic_drop, v_i, r_i, td = action
-            
-            # For each vehicle, check its previous action
-            if veh_status[(v_i)] != []:
-                if td > veh_status[(v_i)][3]:
-                    veh_status[(v_i)] = action
-            else:
-                veh_status[(v_i)] = action
-            
-            # If a request has already been fulfilled, its cost is determined by the delay
-            if pic_drop == 'Dropoff' or pic_drop == 'Pickup':
-                status_req[r_i] += 1
-        
         # [1]
         # Delay (dr) associated with requests where pickup has been done and dropoff has not:
         # dr = dr1 + dr2
@@ -286,13 +1307,12 @@ class FleetProblem(search.Problem):
         # time dropoff optimal = time pickup + direct travel time
         # time dropoff estimated (optimistic) = 
         # = time pickup + travel time between vehicle's current position to dropoff point
-        for action in current_state:
-            pic_drop, v_i, r_i, tp = action
-        
-            # In cases where request pickup has been done and dropoff hasn't,
-            # we need to compute a estimated delay = dr1 + dr2 <= real (future) delay
-            if pic_drop == 'Pickup' and status_req[r_i] != 2:
-                veh_pic_status[(v_i)].append(action)
+        for v_i, (point_j, tp_j, _, onboard) in vehicles.items():
+            for action in onboard:
+                pic_drop, v_i, r_i, tp = action
+                
+                # In cases where request pickup has been done and dropoff hasn't,
+                # we need to compute a estimated delay = dr1 + dr2 <= real (future) delay
                 t_req, origin, drop_off, _  = self.req[r_i]
                 
                 # Delay (dr1) = 
@@ -305,23 +1325,13 @@ class FleetProblem(search.Problem):
                 # td_i_estimated: estimated dropoff time for this request, considering
                 # the current location of the vehicle by its previous action, and that it is going 
                 # from that point to the destination of the request (optimistic case)
-                if veh_status[(v_i)] != []:
-                    a_j, _, r_j, tp_j = veh_status[(v_i)] # Get the last action executed by the vehicle
-                    origin_j, drop_off_j = self.req[r_j][1], self.req[r_j][2]
-                    
-                    if a_j == 'Pickup':
-                        # td_i_estimated = tp_j + Tod(origin_j, destiny_i)
-                        td_i_estimated = tp_j + self.Tod(origin_j, drop_off)
-                    else:
-                        # td_i_estimated = tp_j + Tod(origin_j, destiny_i)
-                        td_i_estimated = tp_j + self.Tod(drop_off_j, drop_off)
-                            
-                    # td_iopt = tpi + Tod(origin_i, destiny_i)
-                    td_iopt = tp + self.Tod(drop_off, origin)
+                # td_i_estimated = tp_j + Tod(point_j, destiny_i)
+                td_i_estimated = tp_j + self.Tlb(point_j, drop_off)
+                        
+                # td_iopt = tpi + Tod(origin_i, destiny_i)
+                td_iopt = tp + self.req_bounds[r_i][0]
 
-                    dr2 = td_i_estimated - td_iopt             
-                else:
-                    dr2 = 0
+                dr2 = td_i_estimated - td_iopt             
                         
                 # Cost of current_state = sum of the request's delay
                 cost += dr1 + dr2
@@ -343,91 +1353,79 @@ class FleetProblem(search.Problem):
         # dr = tp - t_req + t_free
         # t_free: time it takes to execute dropoffs of other requests until it 
         # gets enough available seats + Tod(last dropoff, origin)
-        for r_i, req in enumerate(self.req):
+        # Only the requests in the pickup window (all of them, without a horizon)
+        t_idle = min([time for _, time, _, _ in vehicles.values()], default=0)
+        for r_i in self.pickup_window(status_req, t_idle):
             if status_req[r_i] == 0:
+                req = self.req[r_i]
                 t_req, origin, drop_off, n_pass = req
                 
                 dr1_min = INFINITY
                 
                 best_case = False
-                for capacity, v_i in self.vehicles:
-                    if capacity >= n_pass:
-                        free_seats = capacity
-                        for a in veh_pic_status[(v_i)]:
-                            free_seats -= self.req[a[2]][3]
-                            
-                        if free_seats >= n_pass:
-                            # (a)
-                            if veh_status[(v_i)] != []:
-                                a_j, _, r_j, tp_j = veh_status[(v_i)] # Get the last action executed by the vehicle
-                                origin_j, drop_off_j = self.req[r_j][1], self.req[r_j][2]
+                # Only the vehicles whose capacity fits the request (see fit_vehicles)
+                for capacity, v_i in self.vehicles[: self.fit_count[n_pass]]:
+                    # Location and time of the last action executed by the vehicle
+                    point_j, tp_j, free_seats, onboard = vehicles[(v_i)]
+                        
+                    if free_seats >= n_pass:
+                        # (a)
+                        if point_j is not None:
+                            # tp_i_estimated = tp_j + Tod(point_j, origin_i)
+                            tp = tp_j + self.Tlb(point_j, origin)
+                        else:
+                            tp = self.req_bounds[r_i][2]
+                        
+                        if tp > t_req:   
+                            dr1 = tp - t_req
+                        else:
+                            dr1 = 0
+                            best_case = True
+                    else:
+                        # (b)
+                        # List of possible dropoffs
+                        permutations_list = list(permutations(onboard))
+                        
+                        dr1_free_min = INFINITY
+                        
+                        for perm in permutations_list:
+                            actual_point = point_j
+                            t_free = 0
+                            free_seats_aux = free_seats
+                            delay_aux = 0
+
+                            for ii, act in enumerate(perm):
+                                req = self.req[act[2]]
+                                t_free += self.Tlb(actual_point, req[2])
+                                if ii > 0:
+                                    delay_aux += t_free - self.Tod(point_j, req[2])
+                                        
+                                free_seats_aux += req[3]
                                 
-                                if a_j == 'Pickup':
-                                    # tp_i_estimated = tp_j + Tod(origin_j, origin_i)
-                                    tp = tp_j + self.Tod(origin_j, origin)
-                                else:
-                                    # td_i_estimated = tp_j + Tod(origin_j, origin_i)
-                                    tp = tp_j + self.Tod(drop_off_j, origin)
-                            else:
-                                tp = self.t_opt[(0, origin)]
+                                if free_seats_aux >= n_pass:
+                                    t_free += self.Tlb(req[2], origin)
+                                    break
+                                
+                                actual_point = req[2]
+                                
+                                if tp_j + t_free - t_req + delay_aux >= dr1_min:
+                                    break
                             
+                            tp = tp_j + t_free
                             if tp > t_req:   
-                                dr1 = tp - t_req
+                                dr1 = tp_j + t_free - t_req + delay_aux
                             else:
                                 dr1 = 0
                                 best_case = True
-                        else:
-                            # (b)
-                            a_j, _, r_j, tp_j = veh_status[(v_i)] # Get the last action executed by the vehicle
-                            origin_j, drop_off_j = self.req[r_j][1], self.req[r_j][2]
-                            if a_j == 'Pickup':
-                                point_j = origin_j
-                            else:
-                                point_j = drop_off_j
-                                                            
-                            # List of possible dropoffs
-                            permutations_list = list(permutations(veh_pic_status[(v_i)]))
-                            
-                            dr1_free_min = INFINITY
                             
-                            for perm in permutations_list:
-                                actual_point = point_j
-                                t_free = 0
-                                free_seats_aux = free_seats
-                                delay_aux = 0
-
-                                for ii, act in enumerate(perm):
-                                    req = self.req[act[2]]
-                                    t_free += self.Tod(actual_point, req[2])
-                                    if ii > 0:
-                                        delay_aux += t_free - self.Tod(point_j, req[2])
-                                            
-                                    free_seats_aux += req[3]
-                                    
-                                    if free_seats_aux >= n_pass:
-                                        t_free += self.Tod(req[2], origin)
-                                        break
-                                    
-                                    actual_point = req[2]
-                                    
-                                    if tp_j + t_free - t_req + delay_aux >= dr1_min:
-                                        break
-                                
-                                tp = tp_j + t_free
-                                if tp > t_req:   
-                                    dr1 = tp_j + t_free - t_req + delay_aux
-                                else:
-                                    dr1 = 0
-                                    best_case = True
-                                
-                                if dr1 < dr1_free_min:
-                                    dr1_free_min = dr1                                
-                              
-                            dr1 = dr1_free_min
-                        
-                        if dr1 < dr1_min:
-                            dr1_min = dr1
-                        
+                            if dr1 < dr1_free_min:
+                                dr1_free_min = dr1                                
+                          
+                        dr1 = dr1_free_min
+                    
+                    if dr1 < dr1_min:
+                        dr1_min = dr1
+                    
                     if best_case == True:
                         break
                 
@@ -435,7 +1433,10 @@ class FleetProblem(search.Problem):
 
         # Consider the size of the current state solution. 
         # Higher size -> close to the final solution -> less cost
-        cost += (2 * len(self.req) - len(current_state)) * self.t_opt_min / 1000
+        if self.time_resolution is None:
+            cost += (2 * len(self.req) - sum(status_req)) * self.t_opt_min / 1000
+        else:
+            cost += (2 * len(self.req) - sum(status_req)) * self.t_opt_min // 1000
         return cost 
         
     ''' Calls the informed search algorithm
@@ -446,5 +1447,46 @@ class FleetProblem(search.Problem):
         
         # Assignment 3: Informed search
         # We chose the astar search algorithm 
-        solution = search.astar_search(self, h=self.h, display=True)
-        return str_to_list_of_tuples(solution.state)
+        # Integer times give integer f values: a bucket queue (see utils.BucketQueue)
+        queue = utils.PriorityQueue if self.time_resolution is None else utils.BucketQueue
+        self.initial = self.pack_state(()) if self.compact else self.initial_state()
+        solution = search.astar_search(self, h=self.h, display=True, queue=queue)
+        return list(self.plan(solution.state))
+
+''' Loads the instance in the .dat file path (see FleetProblem.load_file) and,
+    if there is one, its plan from the matching .plan file. '''
+def load_instance(path, packed=False):
+    problem = FleetProblem(packed)
+    problem.load_file(path)
+
+    plan = None
+    plan_path = path[:path.rindex('.dat')] + '.plan'
+    if os.path.exists(plan_path):
+        with open(plan_path, 'r') as fh:
+            plan = str_to_list_of_tuples(fh.read())
+    return problem, plan
+
+''' Problem backed by the shared memory block name (see FleetProblem.share),
+    e.g. for a worker process solving it or one of its variants. '''
+def shared_instance(name):
+    problem = FleetProblem()
+    problem.load_shared(name)
+    return problem
+
+''' Loads every instance (.dat, .dat.gz or .dat.xz file) in the directory path
+    using a pool of worker processes (all CPUs if None; no pool if 1).
+    Returns a dictionary: instance name (e.g. 'ex0') -> (FleetProblem, plan),
+    where plan is None when the instance has no .plan file. '''
+def load_directory(path, workers=None, packed=False):
+    names = sorted(name for name in os.listdir(path)
+                   if name.endswith(('.dat', '.dat.gz', '.dat.xz')))
+    paths = [os.path.join(path, name) for name in names]
+    keys = [name[:name.rindex('.dat')] for name in names]
+
+    if workers == 1:
+        loaded = [load_instance(p, packed) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(load_instance, paths, [packed] * len(paths)))
+
+    return dict(zip(keys, loaded))
@@ -724,10 +724,12 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
+    Also supports dict-like lookup. Membership is a dict lookup (on the hash
+    of the items), so it does not scan the heap."""
 
     def __init__(self, order='min', f=lambda x: x):
         self.heap = []
+        self.counts = {}  # item -> number of times it is in the heap
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
@@ -738,17 +740,27 @@ class PriorityQueue:
     def append(self, item):
         """Insert item at its correct position."""
         heapq.heappush(self.heap, (self.f(item), item))
+        self.counts[item] = self.counts.get(item, 0) + 1
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
         for item in items:
             self.append(item)
 
+    def _discount(self, item):
+        """Take one occurrence of item out of counts."""
+        if self.counts[item] == 1:
+            del self.counts[item]
+        else:
+            self.counts[item] -= 1
+
     def pop(self):
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
         if self.heap:
-            return heapq.heappop(self.heap)[1]
+            item = heapq.heappop(self.heap)[1]
+            self._discount(item)
+            return item
         else:
             raise Exception('Trying to pop from empty PriorityQueue.')
 
@@ -758,7 +770,7 @@ class PriorityQueue:
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return key in self.counts
 
     def __getitem__(self, key):
         """Returns the first value associated with key in PriorityQueue.
@@ -771,12 +783,116 @@ class PriorityQueue:
     def __delitem__(self, key):
         """Delete the first occurrence of key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
+            i = [item == key for _, item in self.heap].index(True)
         except ValueError:
             raise KeyError(str(key) + " is not in the priority queue")
+        self._discount(self.heap[i][1])
+        del self.heap[i]
         heapq.heapify(self.heap)
 
 
+class BucketQueue:
+    """A PriorityQueue for integer f(x) (order 'min' only), kept as a
+    radix heap: items go to the bucket of the highest bit in which f(x)
+    differs from the last popped value, so that append is O(1) and pop is
+    O(1) amortised over the bits of f(x). That holds while f(x) is at least
+    the last popped value, as in A* with a consistent heuristic; items
+    below it are kept apart in a binary heap, which is popped first.
+    Lookup, deletion and membership use a dict, instead of a linear scan;
+    so, unlike PriorityQueue, it holds at most one item equal to each key."""
+
+    def __init__(self, order='min', f=lambda x: x):
+        if order != 'min':
+            raise ValueError("Order must be 'min'.")
+        self.f = f
+        self.last = 0
+        self.buckets = [[]]  # buckets[i]: (f, count, item) with (f ^ last).bit_length() == i
+        self.early = []      # (f, count, item) with f < last
+        self.entries = {}    # item -> (f, count) of its current entry
+        self.count = 0       # Tells apart the entries of an item deleted and appended again
+
+    def _bucket(self, value):
+        i = (value ^ self.last).bit_length()
+        while len(self.buckets) <= i:
+            self.buckets.append([])
+        return self.buckets[i]
+
+    def append(self, item):
+        """Insert item at its correct position."""
+        value = self.f(item)
+        if value != int(value):
+            raise ValueError("BucketQueue needs integer f(x), got " + str(value))
+        value = int(value)
+        self.count += 1
+        entry = (value, self.count, item)
+        self.entries[item] = entry[:2]
+        if value < self.last:
+            heapq.heappush(self.early, entry)
+        else:
+            self._bucket(value).append(entry)
+
+    def extend(self, items):
+        """Insert each item in items at its correct position."""
+        for item in items:
+            self.append(item)
+
+    def _current(self, entry):
+        """Whether entry was not deleted (nor replaced) since it was appended."""
+        return self.entries.get(entry[2]) == entry[:2]
+
+    def pop(self):
+        """Pop and return the item with min f(x)."""
+        while self.early:
+            entry = heapq.heappop(self.early)
+            if self._current(entry):
+                del self.entries[entry[2]]
+                return entry[2]
+
+        while self.entries:
+            if not self.buckets[0]:
+                # Redistribute the first non-empty bucket around its minimum
+                i = 1
+                while not self.buckets[i]:
+                    i += 1
+                entries, self.buckets[i] = self.buckets[i], []
+                entries = [e for e in entries if self._current(e)]
+                if not entries:
+                    continue
+                self.last = min(entries)[0]
+                for entry in entries:
+                    self._bucket(entry[0]).append(entry)
+
+            entry = self.buckets[0].pop()
+            if self._current(entry):
+                del self.entries[entry[2]]
+                return entry[2]
+
+        raise Exception('Trying to pop from empty BucketQueue.')
+
+    def __len__(self):
+        """Return current capacity of BucketQueue."""
+        return len(self.entries)
+
+    def __contains__(self, key):
+        """Return True if the key is in BucketQueue."""
+        return key in self.entries
+
+    def __getitem__(self, key):
+        """Returns the value associated with key in BucketQueue.
+        Raises KeyError if key is not present."""
+        try:
+            return self.entries[key][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+
+    def __delitem__(self, key):
+        """Delete key (its entry is skipped when its bucket is reached)."""
+        try:
+            del self.entries[key]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+
+
 # ______________________________________________________________________________
 # Useful Shorthands
 